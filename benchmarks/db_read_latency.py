@@ -0,0 +1,98 @@
+"""Read latency under a concurrent write load.
+
+Seeds a channel with many birthdays, then lists them repeatedly while
+background tasks keep writing known_users rows one commit at a time.
+Runs once with reads sharing the writer connection (pool size 0) and once
+per requested pool size.
+
+    python -m benchmarks.db_read_latency [--birthdays N] [--pool-sizes 0 4]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from bot.db.database import Database
+from bot.db.repositories import Repository
+
+CHANNEL_ID = -100
+
+
+async def run(pool_size: int, birthdays: int, reads: int, writers: int) -> list[float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db", read_pool_size=pool_size)
+        await db.connect()
+        repo = Repository(db, known_users_cache_size=0)
+        try:
+            await repo.upsert_channel(CHANNEL_ID, "Bench", "UTC", "09:00")
+            async with db.transaction() as conn:
+                await conn.executemany(
+                    """
+                    INSERT INTO birthdays (channel_id, user_id, first_name,
+                                           birth_day, birth_month, set_by)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (CHANNEL_ID, uid, f"User {uid}",
+                         uid % 28 + 1, uid % 12 + 1, uid)
+                        for uid in range(birthdays)
+                    ],
+                )
+
+            stop = asyncio.Event()
+
+            async def write_loop(offset: int) -> None:
+                n = 0
+                while not stop.is_set():
+                    await repo.upsert_known_user(
+                        offset * 1_000_000 + n, CHANNEL_ID, f"u{n}", "Writer"
+                    )
+                    n += 1
+
+            async def read_loop() -> list[float]:
+                latencies = []
+                for _ in range(reads):
+                    start = time.perf_counter()
+                    # The whole channel as one page, like the full listing
+                    await repo.get_birthdays_page(CHANNEL_ID, limit=birthdays)
+                    latencies.append((time.perf_counter() - start) * 1000)
+                return latencies
+
+            write_tasks = [asyncio.create_task(write_loop(i)) for i in range(writers)]
+            latencies = await read_loop()
+            stop.set()
+            await asyncio.gather(*write_tasks)
+        finally:
+            await db.disconnect()
+    return latencies
+
+
+def report(pool_size: int, latencies: list[float]) -> None:
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"pool={pool_size:<3} reads={len(latencies):<5} "
+        f"p50={statistics.median(latencies):7.2f} ms  "
+        f"p95={p95:7.2f} ms  max={latencies[-1]:7.2f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--birthdays", type=int, default=500)
+    parser.add_argument("--reads", type=int, default=300)
+    parser.add_argument("--writers", type=int, default=4)
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[0, 4])
+    args = parser.parse_args()
+
+    for pool_size in args.pool_sizes:
+        latencies = await run(pool_size, args.birthdays, args.reads, args.writers)
+        report(pool_size, latencies)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
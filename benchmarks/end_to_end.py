@@ -0,0 +1,200 @@
+"""Greeting fan-out throughput and update latency against a fake Bot API.
+
+Starts ``benchmarks.fake_telegram`` on a random port and points a real
+``aiogram.Bot`` at it, so requests go through HTTP, aiogram's session and
+the bot's own rate limiting, just without Telegram.
+
+Fan-out: queues one greeting per birthday across ``--channels`` channels
+in a temporary database and drains the outbox through the send queue,
+reporting greetings per second and 429 retries.
+
+Updates: pushes ``/mybirthday`` from ``--updates`` distinct chats, once
+with the dispatcher long polling and once with updates delivered to the
+bot's webhook server (``bot.webhook``), reporting the time from an update
+being available to the bot's reply reaching the API in each mode.
+
+    python -m benchmarks.end_to_end [--channels 50] [--birthdays 20] \
+        [--latency 0.02] [--rate-limit 0.01] [--webhook-concurrency 40]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import datetime
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from aiogram import Bot, Dispatcher
+from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+from aiogram.enums import ParseMode
+
+from benchmarks.fake_telegram import FakeTelegram
+from bot.db.database import Database
+from bot.db.repositories import Repository
+from bot.handlers import register_handlers
+from bot.services.admin import AdminService
+from bot.services.birthday import BirthdayService
+from bot.services.greeting import GreetingService
+from bot.services.media import MediaSender
+from bot.services.outbox import GreetingOutbox
+from bot.services.send_queue import SendQueue
+from bot.services.tracking import UserTracker
+from bot.webhook import WebhookServer
+
+TOKEN = "1:bench"
+WEBHOOK_SECRET = "bench-secret"
+
+
+def make_bot(api_url: str) -> Bot:
+    return Bot(
+        token=TOKEN,
+        session=AiohttpSession(api=TelegramAPIServer.from_base(api_url)),
+        default=DefaultBotProperties(parse_mode=ParseMode.HTML),
+    )
+
+
+async def fan_out(args: argparse.Namespace, tmp: Path) -> None:
+    fake = FakeTelegram(args.latency, args.rate_limit, args.retry_after, seed=1)
+    bot = make_bot(await fake.start())
+    db = Database(tmp / "fanout.db")
+    await db.connect()
+    repo = Repository(db)
+    send_queue = SendQueue(
+        global_rate=args.global_rate,
+        chat_rate=args.chat_rate_per_min / 60,
+        concurrency=args.concurrency,
+    )
+    greeting_service = GreetingService(bot, send_queue, repo, MediaSender(bot, repo))
+    outbox = GreetingOutbox(repo, greeting_service)
+
+    today = datetime.date.today()
+    rows = []
+    for c in range(args.channels):
+        channel_id = -1000 - c
+        await repo.upsert_channel(channel_id, f"Chat {c}", "UTC", "09:00")
+        for u in range(args.birthdays):
+            rows.append(
+                (channel_id, u + 1, today.year, f"user{u}", None, today.day, today.month)
+            )
+    await outbox.enqueue(rows)
+
+    send_queue.start()
+    start = time.perf_counter()
+    await outbox.drain()
+    elapsed = time.perf_counter() - start
+    await send_queue.stop()
+
+    sent = len(fake.calls_to("sendMessage")) - fake.rate_limited
+    print(
+        f"fan-out: {outbox.sent} greetings in {elapsed:.2f}s "
+        f"({outbox.sent / elapsed:.0f}/s), {sent} sendMessage ok, "
+        f"{fake.rate_limited} rate limited, queue {send_queue.stats}"
+    )
+    await db.disconnect()
+    await bot.session.close()
+    await fake.stop()
+
+
+async def update_latency(
+    args: argparse.Namespace, tmp: Path, dp: Dispatcher, mode: str
+) -> None:
+    fake = FakeTelegram(args.latency, seed=1)
+    bot = make_bot(await fake.start())
+    db = Database(tmp / f"updates-{mode}.db")
+    await db.connect()
+    repo = Repository(db)
+    user_tracker = UserTracker(repo, 5, 500)
+
+    dp["repo"] = repo
+    dp["admin_service"] = AdminService(repo, 1, bot)
+    dp["birthday_service"] = BirthdayService(repo)
+    dp["user_tracker"] = user_tracker
+    user_tracker.start()
+    if mode == "polling":
+        polling = asyncio.create_task(
+            dp.start_polling(bot, handle_signals=False, polling_timeout=30)
+        )
+        while not fake.calls_to("getUpdates"):
+            await asyncio.sleep(0.01)
+    else:
+        server = WebhookServer(
+            dp, bot, WEBHOOK_SECRET, concurrency=args.webhook_concurrency
+        )
+        port = await server.start("127.0.0.1", 0)
+        await bot.set_webhook(
+            f"http://127.0.0.1:{port}/webhook",
+            secret_token=WEBHOOK_SECRET,
+            max_connections=args.webhook_concurrency,
+        )
+
+    pushed: dict[str, float] = {}
+    for n in range(args.updates):
+        chat_id = -2000 - n
+        pushed[str(chat_id)] = time.monotonic()
+        fake.push_update(FakeTelegram.group_message(chat_id, n + 1, "/mybirthday"))
+        await asyncio.sleep(1 / args.update_rate)
+
+    deadline = time.monotonic() + 10
+    replies: dict[str, float] = {}
+    while len(replies) < len(pushed) and time.monotonic() < deadline:
+        for call in fake.calls_to("sendMessage"):
+            replies.setdefault(call.params["chat_id"], call.at)
+        await asyncio.sleep(0.01)
+
+    latencies = sorted(
+        (replies[chat] - at) * 1000 for chat, at in pushed.items() if chat in replies
+    )
+    if latencies:
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(
+            f"{mode}: {len(latencies)}/{len(pushed)} answered, latency ms "
+            f"p50={statistics.median(latencies):.1f} p95={p95:.1f} "
+            f"max={latencies[-1]:.1f}"
+        )
+    else:
+        print(f"{mode}: no replies")
+
+    # Let the last replies complete before polling closes the bot session
+    while fake.in_flight:
+        await asyncio.sleep(0.01)
+    if mode == "polling":
+        await dp.stop_polling()
+        await polling
+    else:
+        await server.stop()
+        await bot.session.close()
+    await user_tracker.stop()
+    await db.disconnect()
+    await fake.stop()
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--channels", type=int, default=50)
+    parser.add_argument("--birthdays", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds per call")
+    parser.add_argument("--rate-limit", type=float, default=0.01)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--global-rate", type=float, default=30)
+    parser.add_argument("--chat-rate-per-min", type=float, default=20)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--updates", type=int, default=200)
+    parser.add_argument("--update-rate", type=float, default=100, help="updates/s")
+    parser.add_argument("--webhook-concurrency", type=int, default=40)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        await fan_out(args, Path(tmp))
+        # Routers can only be attached once, so both modes share a dispatcher
+        dp = Dispatcher()
+        register_handlers(dp)
+        await update_latency(args, Path(tmp), dp, "polling")
+        await update_latency(args, Path(tmp), dp, "webhook")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,302 @@
+"""Local stand-in for the Telegram Bot API, for load tests and benchmarks.
+
+Serves ``/bot<token>/<method>`` like api.telegram.org, so a bot can be
+pointed at it with ``TELEGRAM_API_URL=http://127.0.0.1:8081``. Supports
+getMe, getUpdates (long polling over updates pushed with ``push_update``),
+setWebhook/deleteWebhook (pushed updates are then POSTed to the webhook,
+like Telegram does), sendMessage, sendPhoto/sendAnimation/sendSticker and
+getChat; any other method answers ``true``. Every call is recorded, and
+each can be delayed by ``latency`` seconds and answered with a 429 with
+probability ``rate_limit``.
+
+    python -m benchmarks.fake_telegram --port 8081 --latency 0.05 --rate-limit 0.01
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+import time
+from typing import Any
+
+from aiohttp import ClientError, ClientSession, web
+
+BOT_USER = {
+    "id": 1,
+    "is_bot": True,
+    "first_name": "Fake Bot",
+    "username": "fake_bot",
+}
+
+
+class Call:
+    __slots__ = ("method", "params", "at")
+
+    def __init__(self, method: str, params: dict[str, Any], at: float) -> None:
+        self.method = method
+        self.params = params
+        self.at = at
+
+
+class FakeTelegram:
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit: float = 0.0,
+        retry_after: int = 1,
+        seed: int | None = None,
+    ) -> None:
+        self.latency = latency
+        self.rate_limit = rate_limit
+        self.retry_after = retry_after
+        self.calls: list[Call] = []
+        self.rate_limited = 0
+        self.in_flight = 0
+        self._random = random.Random(seed)
+        self._message_ids = itertools.count(1)
+        self._update_ids = itertools.count(1)
+        self._updates: list[dict[str, Any]] = []
+        self._new_updates = asyncio.Event()
+        self._runner: web.AppRunner | None = None
+        self.url = ""
+        # Webhook set with setWebhook, and deliveries to it in progress
+        self.webhook_url = ""
+        self.webhook_failures = 0
+        self._webhook_secret = ""
+        self._webhook_slots = asyncio.Semaphore(40)
+        self._deliveries: set[asyncio.Task] = set()
+        self._client: ClientSession | None = None
+
+    # ── Lifecycle ─────────────────────────────────────────────────────
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self._handle)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        """Start serving and return the base URL for ``TELEGRAM_API_URL``."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://{host}:{port}"
+        return self.url
+
+    async def stop(self) -> None:
+        """Stop serving once calls and webhook deliveries in progress have finished."""
+        if self._deliveries:
+            await asyncio.gather(*self._deliveries, return_exceptions=True)
+        if self._client:
+            await self._client.close()
+            self._client = None
+        while self.in_flight:
+            await asyncio.sleep(0.01)
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    # ── Test helpers ──────────────────────────────────────────────────
+
+    def push_update(self, update: dict[str, Any]) -> int:
+        """Queue an update for getUpdates, or deliver it to the webhook if
+        one is set. Returns its update_id."""
+        update_id = next(self._update_ids)
+        update = {"update_id": update_id, **update}
+        if self.webhook_url:
+            task = asyncio.create_task(self._deliver(update))
+            self._deliveries.add(task)
+            task.add_done_callback(self._deliveries.discard)
+        else:
+            self._updates.append(update)
+            self._new_updates.set()
+        return update_id
+
+    def calls_to(self, method: str) -> list[Call]:
+        return [call for call in self.calls if call.method == method]
+
+    @staticmethod
+    def group_message(chat_id: int, user_id: int, text: str) -> dict[str, Any]:
+        """A ``message`` update from ``user_id`` in supergroup ``chat_id``."""
+        return {
+            "message": {
+                "message_id": 1,
+                "date": int(time.time()),
+                "chat": {"id": chat_id, "type": "supergroup", "title": f"Chat {chat_id}"},
+                "from": {"id": user_id, "is_bot": False, "first_name": f"User {user_id}"},
+                "text": text,
+                "entities": (
+                    [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+                    if text.startswith("/")
+                    else []
+                ),
+            }
+        }
+
+    # ── Handlers ──────────────────────────────────────────────────────
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        method = request.match_info["method"]
+        params = {
+            key: value
+            for key, value in (await request.post()).items()
+            if isinstance(value, str)
+        }
+        self.calls.append(Call(method, params, time.monotonic()))
+
+        if method == "getUpdates":
+            if self.webhook_url:
+                return web.json_response(
+                    {
+                        "ok": False,
+                        "error_code": 409,
+                        "description": "Conflict: can't use getUpdates method "
+                        "while webhook is active; use deleteWebhook to delete "
+                        "the webhook first",
+                    }
+                )
+            return self._ok(await self._get_updates(params))
+        self.in_flight += 1
+        try:
+            return await self._answer(method, params)
+        finally:
+            self.in_flight -= 1
+
+    async def _answer(self, method: str, params: dict[str, str]) -> web.Response:
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.rate_limit and self._random.random() < self.rate_limit:
+            self.rate_limited += 1
+            return web.json_response(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {self.retry_after}",
+                    "parameters": {"retry_after": self.retry_after},
+                }
+            )
+
+        if method == "getMe":
+            return self._ok(BOT_USER)
+        if method == "setWebhook":
+            self.webhook_url = params["url"]
+            self._webhook_secret = params.get("secret_token", "")
+            self._webhook_slots = asyncio.Semaphore(
+                int(params.get("max_connections", 40))
+            )
+            return self._ok(True)
+        if method == "deleteWebhook":
+            self.webhook_url = ""
+            return self._ok(True)
+        if method == "getChat":
+            return self._ok(self._chat(int(params["chat_id"])))
+        if method == "sendMessage":
+            return self._ok(self._message(params, text=params.get("text", "")))
+        if method == "sendPhoto":
+            photo = {"file_id": "photo-1", "file_unique_id": "p1", "width": 1, "height": 1}
+            return self._ok(self._message(params, photo=[photo]))
+        if method == "sendAnimation":
+            animation = {
+                "file_id": "animation-1",
+                "file_unique_id": "a1",
+                "width": 1,
+                "height": 1,
+                "duration": 1,
+            }
+            return self._ok(self._message(params, animation=animation))
+        if method == "sendSticker":
+            sticker = {
+                "file_id": "sticker-1",
+                "file_unique_id": "s1",
+                "type": "regular",
+                "width": 1,
+                "height": 1,
+                "is_animated": False,
+                "is_video": False,
+            }
+            return self._ok(self._message(params, sticker=sticker))
+        return self._ok(True)
+
+    async def _get_updates(self, params: dict[str, str]) -> list[dict[str, Any]]:
+        offset = int(params.get("offset", 0))
+        timeout = float(params.get("timeout", 0))
+        self._updates = [u for u in self._updates if u["update_id"] >= offset]
+        if not self._updates and timeout:
+            self._new_updates.clear()
+            try:
+                await asyncio.wait_for(self._new_updates.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._updates[: int(params.get("limit", 100))]
+
+    async def _deliver(self, update: dict[str, Any]) -> None:
+        # Like Telegram, at most max_connections requests are open at once
+        async with self._webhook_slots:
+            if self._client is None:
+                self._client = ClientSession()
+            try:
+                async with self._client.post(
+                    self.webhook_url,
+                    json=update,
+                    headers={"X-Telegram-Bot-Api-Secret-Token": self._webhook_secret},
+                ) as response:
+                    if response.status != 200:
+                        self.webhook_failures += 1
+            except ClientError:
+                self.webhook_failures += 1
+
+    def _chat(self, chat_id: int) -> dict[str, Any]:
+        return {
+            "id": chat_id,
+            "type": "private" if chat_id > 0 else "supergroup",
+            "title": None if chat_id > 0 else f"Chat {chat_id}",
+            "accent_color_id": 0,
+            "max_reaction_count": 11,
+            "accepted_gift_types": {
+                "unlimited_gifts": False,
+                "limited_gifts": False,
+                "unique_gifts": False,
+                "premium_subscription": False,
+                "gifts_from_channels": False,
+            },
+        }
+
+    def _message(self, params: dict[str, str], **content: Any) -> dict[str, Any]:
+        chat_id = int(params["chat_id"])
+        return {
+            "message_id": next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {
+                "id": chat_id,
+                "type": "private" if chat_id > 0 else "supergroup",
+            },
+            "from": BOT_USER,
+            **content,
+        }
+
+    @staticmethod
+    def _ok(result: Any) -> web.Response:
+        return web.json_response({"ok": True, "result": result}, dumps=json.dumps)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds per call")
+    parser.add_argument(
+        "--rate-limit", type=float, default=0.0, help="probability of a 429 per call"
+    )
+    parser.add_argument("--retry-after", type=int, default=1)
+    args = parser.parse_args()
+
+    server = FakeTelegram(args.latency, args.rate_limit, args.retry_after)
+    print(f"Fake Bot API on http://{args.host}:{args.port}")
+    web.run_app(server.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
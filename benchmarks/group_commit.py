@@ -0,0 +1,69 @@
+"""Commits per second with and without group commit.
+
+Runs concurrent writers that each upsert known_users rows in their own
+transaction for a fixed duration, and reports committed transactions and
+actual COMMITs per second for each group-commit window.
+
+    python -m benchmarks.group_commit [--writers N] [--windows-ms 0 2 5]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import tempfile
+import time
+from pathlib import Path
+
+from bot.db.database import Database
+from bot.db.repositories import Repository
+
+CHANNEL_ID = -100
+
+
+async def run(window_ms: float, writers: int, duration: float) -> tuple[float, float]:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(
+            Path(tmp) / "bench.db", group_commit_window=window_ms / 1000
+        )
+        await db.connect()
+        repo = Repository(db, known_users_cache_size=0)
+        await repo.upsert_channel(CHANNEL_ID, "Bench", "UTC", "09:00")
+        before = db.stats
+        deadline = time.perf_counter() + duration
+
+        async def write_loop(offset: int) -> None:
+            n = 0
+            while time.perf_counter() < deadline:
+                await repo.upsert_known_user(
+                    offset * 1_000_000 + n, CHANNEL_ID, f"u{n}", "Writer"
+                )
+                n += 1
+
+        start = time.perf_counter()
+        await asyncio.gather(*(write_loop(i) for i in range(writers)))
+        elapsed = time.perf_counter() - start
+        after = db.stats
+        await db.disconnect()
+    transactions = after["transactions"] - before["transactions"]
+    commits = after["commits"] - before["commits"]
+    return transactions / elapsed, commits / elapsed
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--writers", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=3.0)
+    parser.add_argument("--windows-ms", type=float, nargs="+", default=[0, 2, 5])
+    args = parser.parse_args()
+
+    for window_ms in args.windows_ms:
+        tx_rate, commit_rate = await run(window_ms, args.writers, args.duration)
+        print(
+            f"window={window_ms:>4g} ms  transactions/s={tx_rate:8.0f}  "
+            f"commits/s={commit_rate:8.0f}  "
+            f"transactions per commit={tx_rate / commit_rate:6.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,141 @@
+"""Check that every Repository query is served by an index.
+
+Runs each Repository method against a throwaway database, records the SQL
+it issues and prints ``EXPLAIN QUERY PLAN`` for every read, update and
+delete. Exits with status 1 if any of them falls back to a full table scan.
+
+    python -m benchmarks.query_plans
+"""
+from __future__ import annotations
+
+import asyncio
+import sys
+import tempfile
+from pathlib import Path
+
+import aiosqlite
+
+from bot.db.database import Database
+from bot.db.models import OutboxEntry
+from bot.db.repositories import Repository
+
+# Queries that intentionally read the whole table (run once at startup).
+FULL_SCAN_ALLOWED = {
+    "get_all_channels",
+    "release_outbox_claims",
+    "prune_sent_greetings",
+}
+
+CHANNEL_ID = -100
+USER_ID = 42
+OUTBOX_ENTRY = OutboxEntry(1, CHANNEL_ID, USER_ID, 2024, "name", "Name", 1, 1, 1)
+
+CALLS: list[tuple[str, tuple]] = [
+    ("get_channel", (CHANNEL_ID,)),
+    ("get_all_channels", ()),
+    ("update_channel_timezone", (CHANNEL_ID, "UTC")),
+    ("update_channel_greeting_time", (CHANNEL_ID, "09:00")),
+    ("get_birthday", (CHANNEL_ID, USER_ID)),
+    ("get_birthdays_page", (CHANNEL_ID,)),
+    ("get_birthdays_page", (CHANNEL_ID, (1, 1, 1))),
+    ("get_birthdays_page", (CHANNEL_ID, None, (12, 31, 1))),
+    ("get_birthdays_by_date", (CHANNEL_ID, 1, 1)),
+    ("get_upcoming_birthdays", (CHANNEL_ID, 10, 40)),
+    ("get_upcoming_birthdays", (CHANNEL_ID, 360, 8)),
+    ("get_birthdays_by_dates", ([(CHANNEL_ID, 1, 1), (CHANNEL_ID - 1, 2, 2)],)),
+    ("update_birthday_user_info", (CHANNEL_ID, USER_ID, "name", "Name")),
+    ("remove_birthday", (CHANNEL_ID, USER_ID)),
+    ("is_admin", (CHANNEL_ID, USER_ID)),
+    ("get_channels_page", (None, CHANNEL_ID - 10)),
+    ("get_channels_page", (None, None, CHANNEL_ID + 10)),
+    ("get_channels_page", (USER_ID, CHANNEL_ID - 10)),
+    ("get_channels_page", (USER_ID, None, CHANNEL_ID + 10)),
+    ("search_channels", ("Te",)),
+    ("search_channels", ("Te", USER_ID)),
+    ("remove_admin", (CHANNEL_ID, USER_ID)),
+    ("find_user_by_username", (CHANNEL_ID, "name")),
+    ("find_user_by_id", (CHANNEL_ID, USER_ID)),
+    ("claim_outbox", (10, 0.0, 60.0)),
+    ("claim_channel_outbox", (CHANNEL_ID, 0.0, 60.0)),
+    ("release_outbox_claims", ()),
+    ("retry_greeting", (OUTBOX_ENTRY.id, 0.0, "error")),
+    ("complete_greeting", (OUTBOX_ENTRY,)),
+    ("drop_greeting", (OUTBOX_ENTRY.id,)),
+    ("prune_sent_greetings", (2024,)),
+    ("get_state", ("scheduler_watermark",)),
+    ("get_templates", (CHANNEL_ID,)),
+    ("remove_template", (CHANNEL_ID, 1)),
+    ("reset_template_rotation", (CHANNEL_ID,)),
+    ("get_media_file_id", ("0" * 64, "photo")),
+    ("delete_media_file_id", ("0" * 64, "photo")),
+    ("get_fsm_record", ("1:1:1", 0.0)),
+    ("delete_fsm_record", ("1:1:1",)),
+    ("prune_fsm_records", (0.0,)),
+    ("migrate_channel", (CHANNEL_ID, CHANNEL_ID - 1)),
+    ("deactivate_channel", (CHANNEL_ID - 1,)),
+    ("remove_channel", (CHANNEL_ID - 1,)),
+]
+
+
+async def main() -> int:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "plans.db")
+        await db.connect()
+        repo = Repository(db)
+        await repo.upsert_channel(CHANNEL_ID, "Test", "UTC", "09:00")
+        await repo.set_birthday(CHANNEL_ID, USER_ID, "name", "Name", 1, 1, USER_ID)
+        await repo.add_admin(CHANNEL_ID, USER_ID, USER_ID)
+        await repo.upsert_known_user(USER_ID, CHANNEL_ID, "name", "Name")
+        await repo.enqueue_greetings(
+            [(CHANNEL_ID, USER_ID, 2024, "name", "Name", 1, 1)], 0.0
+        )
+
+        execute = aiosqlite.Connection.execute
+        recorded: list[tuple[str, str, tuple]] = []
+        current = ""
+
+        def recording_execute(self, sql, parameters=None):
+            recorded.append((current, sql, tuple(parameters or ())))
+            return execute(self, sql, parameters)
+
+        aiosqlite.Connection.execute = recording_execute
+        try:
+            for name, args in CALLS:
+                current = name
+                await getattr(repo, name)(*args)
+        finally:
+            aiosqlite.Connection.execute = execute
+
+        conn = db.conn
+
+        failures = 0
+        for name, sql, params in recorded:
+            if not sql.lstrip().upper().startswith(("SELECT", "WITH", "UPDATE", "DELETE")):
+                continue
+            cursor = await conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+            details = [row[3] for row in await cursor.fetchall()]
+            # VALUES lists and the CTEs built from them are scanned by design
+            materialized = {
+                d.split()[1] for d in details if d.startswith("MATERIALIZE")
+            }
+            full_scan = any(
+                d.startswith("SCAN")
+                and "INDEX" not in d
+                and "CONSTANT ROWS" not in d
+                and d.split()[1] not in materialized
+                for d in details
+            )
+            status = "ok"
+            if full_scan and name not in FULL_SCAN_ALLOWED:
+                status = "FULL SCAN"
+                failures += 1
+            print(f"[{status}] {name}")
+            for detail in details:
+                print(f"    {detail}")
+
+        await db.disconnect()
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
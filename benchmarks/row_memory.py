@@ -0,0 +1,110 @@
+"""Memory and allocations of typed row records vs. dict rows.
+
+Loads every birthday of a large synthetic channel twice: once the old way
+(``sqlite3.Row`` converted with ``dict(row)``) and once through
+``Repository.get_birthdays_page`` with a page as large as the channel,
+which builds ``Birthday`` records directly with a row factory. Reports
+retained and peak memory, allocated blocks and wall time for each.
+
+    python -m benchmarks.row_memory [--birthdays N]
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from bot.db.database import Database
+from bot.db.repositories import Repository
+
+CHANNEL_ID = -100
+
+DICT_QUERY = """
+    SELECT b.*,
+           COALESCE(k.first_name, b.first_name) AS first_name,
+           COALESCE(k.username, b.username)     AS username
+    FROM birthdays b
+    LEFT JOIN known_users k
+        ON k.user_id = b.user_id AND k.channel_id = b.channel_id
+    WHERE b.channel_id = ?
+    ORDER BY b.birth_month, b.birth_day
+"""
+
+
+def live_blocks() -> int:
+    return sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+
+
+async def measure(
+    label: str, load: Callable[[], Awaitable[list[Any]]], rounds: int
+) -> None:
+    await load()  # warm up caches and the statement cache
+    gc.collect()
+    tracemalloc.start()
+    before, _ = tracemalloc.get_traced_memory()
+    blocks_before = live_blocks()
+    rows = await load()
+    retained, peak = tracemalloc.get_traced_memory()
+    blocks_after = live_blocks()
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        await load()
+    elapsed = (time.perf_counter() - start) / rounds * 1000
+
+    print(
+        f"{label:<14} rows={len(rows):<7} "
+        f"retained={(retained - before) / 1024:9.0f} KiB  "
+        f"peak={(peak - before) / 1024:9.0f} KiB  "
+        f"live blocks={blocks_after - blocks_before:8d}  time={elapsed:7.1f} ms"
+    )
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--birthdays", type=int, default=20_000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(Path(tmp) / "bench.db", read_pool_size=1)
+        await db.connect()
+        repo = Repository(db)
+        try:
+            await repo.upsert_channel(CHANNEL_ID, "Bench", "UTC", "09:00")
+            async with db.transaction() as conn:
+                await conn.executemany(
+                    """
+                    INSERT INTO birthdays (channel_id, user_id, username, first_name,
+                                           birth_day, birth_month, set_by)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    [
+                        (CHANNEL_ID, uid, f"user{uid}", f"User {uid}",
+                         uid % 28 + 1, uid % 12 + 1, uid)
+                        for uid in range(args.birthdays)
+                    ],
+                )
+
+            async def load_dicts() -> list[dict[str, Any]]:
+                async with db.reader() as conn:
+                    cursor = await conn.execute(DICT_QUERY, (CHANNEL_ID,))
+                    return [dict(r) for r in await cursor.fetchall()]
+
+            async def load_records() -> list[Any]:
+                return await repo.get_birthdays_page(CHANNEL_ID, limit=args.birthdays)
+
+            await measure("dict rows", load_dicts, args.rounds)
+            await measure("Birthday rows", load_records, args.rounds)
+        finally:
+            await db.disconnect()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
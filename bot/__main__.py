@@ -1,8 +1,11 @@
 import asyncio
 import logging
+import secrets
 
 from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 from aiogram.enums import ParseMode
 
 from bot.config import settings
@@ -11,8 +14,14 @@ from bot.db.repositories import Repository
 from bot.handlers import register_handlers
 from bot.services.admin import AdminService
 from bot.services.birthday import BirthdayService
+from bot.services.fsm_storage import SQLiteStorage
 from bot.services.greeting import GreetingService
+from bot.services.media import MediaSender
+from bot.services.outbox import GreetingOutbox
 from bot.services.scheduler import SchedulerService
+from bot.services.send_queue import SendQueue
+from bot.services.tracking import UserTracker
+from bot.webhook import WebhookServer
 
 logger = logging.getLogger(__name__)
 
@@ -23,33 +32,89 @@ async def main() -> None:
         format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
     )
 
+    session = None
+    if settings.telegram_api_url:
+        # e.g. a self-hosted Bot API server or benchmarks/fake_telegram.py
+        session = AiohttpSession(
+            api=TelegramAPIServer.from_base(settings.telegram_api_url)
+        )
     bot = Bot(
         token=settings.bot_token,
+        session=session,
         default=DefaultBotProperties(parse_mode=ParseMode.HTML),
     )
 
-    db = Database(settings.db_path)
+    db = Database(
+        settings.db_path,
+        read_pool_size=settings.db_read_pool_size,
+        group_commit_window=settings.db_group_commit_ms / 1000,
+    )
     await db.connect()
 
-    repo = Repository(db)
-    admin_service = AdminService(repo, settings.bot_owner_id, bot)
-    birthday_service = BirthdayService(repo)
-    greeting_service = GreetingService(bot)
-    scheduler_service = SchedulerService(repo, greeting_service)
+    repo = Repository(
+        db,
+        known_users_cache_size=settings.known_users_cache_size,
+        known_users_cache_ttl=settings.known_users_cache_ttl,
+        channel_cache_size=settings.channel_cache_size,
+    )
+    birthday_service = BirthdayService(
+        repo, page_cache_size=settings.birthday_page_cache_size
+    )
+    send_queue = SendQueue(
+        global_rate=settings.send_global_rate,
+        chat_rate=settings.send_chat_rate_per_min / 60,
+        concurrency=settings.send_concurrency,
+    )
+    greeting_service = GreetingService(
+        bot,
+        send_queue,
+        repo,
+        MediaSender(bot, repo),
+        template_cache_size=settings.template_cache_size,
+    )
+    outbox = GreetingOutbox(
+        repo,
+        greeting_service,
+        batch_size=settings.outbox_batch_size,
+        max_attempts=settings.outbox_max_attempts,
+    )
+    scheduler_service = SchedulerService(
+        repo, outbox, catchup_grace=settings.catchup_grace_minutes
+    )
+    admin_service = AdminService(
+        repo,
+        settings.bot_owner_id,
+        bot,
+        scheduler_service,
+        membership_ttl=settings.membership_cache_ttl,
+        membership_concurrency=settings.membership_check_concurrency,
+    )
+    user_tracker = UserTracker(
+        repo, settings.tracking_flush_interval, settings.tracking_batch_size
+    )
+
+    fsm_storage = SQLiteStorage(
+        repo, ttl=settings.fsm_state_ttl, cache_size=settings.fsm_cache_size
+    )
 
-    dp = Dispatcher()
+    dp = Dispatcher(storage=fsm_storage)
     dp["repo"] = repo
     dp["admin_service"] = admin_service
     dp["birthday_service"] = birthday_service
     dp["greeting_service"] = greeting_service
     dp["scheduler_service"] = scheduler_service
+    dp["user_tracker"] = user_tracker
 
     register_handlers(dp)
 
     @dp.startup()
     async def on_startup() -> None:
+        send_queue.start()
+        await outbox.start()
         logger.info("Starting scheduler...")
         await scheduler_service.start()
+        user_tracker.start()
+        fsm_storage.start()
         me = await bot.get_me()
         logger.info("Bot started: @%s", me.username)
 
@@ -57,11 +122,46 @@ async def main() -> None:
     async def on_shutdown() -> None:
         logger.info("Shutting down scheduler...")
         scheduler_service.shutdown()
+        await admin_service.stop()
+        # The outbox waits for its batch in progress, which needs the queue
+        await outbox.stop()
+        await send_queue.stop()
+        logger.info("Media cache: %s", greeting_service.media_stats)
+        logger.info("Flushing tracked users...")
+        await user_tracker.stop()
+        await fsm_storage.close()
+        logger.info(
+            "Cache stats: %s",
+            {
+                **repo.cache_stats(),
+                "templates": greeting_service.template_cache.stats,
+                "membership": admin_service.membership_cache.stats,
+                "birthday_pages": birthday_service.page_cache.stats,
+                "fsm": fsm_storage.cache.stats,
+            },
+        )
         logger.info("Closing database...")
         await db.disconnect()
 
     try:
-        await dp.start_polling(bot)
+        if settings.run_mode == "webhook":
+            server = WebhookServer(
+                dp,
+                bot,
+                # Telegram only needs the token for this run's setWebhook
+                settings.webhook_secret or secrets.token_urlsafe(32),
+                path=settings.webhook_path,
+                concurrency=settings.webhook_max_concurrency,
+            )
+            await server.run(
+                settings.webhook_host,
+                settings.webhook_port,
+                settings.webhook_url.rstrip("/") + settings.webhook_path,
+            )
+        else:
+            # A webhook left by webhook mode would make getUpdates fail
+            await bot.delete_webhook()
+            await dp.start_polling(bot)
     finally:
         await bot.session.close()
 
@@ -0,0 +1,99 @@
+"""Greeting template catalogs, one JSON data file per locale.
+
+A catalog file ``<locale>.json`` holds the built-in ``templates`` for that
+language, the words used when composing greetings (``friend`` for people
+without a name, ``and`` to join the last two names of a combined greeting)
+and optionally its own ``months`` names. Catalogs are read and compiled on
+first use and then cached, so importing this package reads no files.
+
+A template is either a string or an object with ``text`` and ``media``:
+``{"type": "photo" | "animation" | "sticker", "file": "cake.webp"}``. Media
+paths are relative to ``bot/catalogs/media/``.
+"""
+from __future__ import annotations
+
+import functools
+import json
+import logging
+from pathlib import Path
+from typing import Any
+
+from bot.utils.date_helpers import MONTH_NAMES
+from bot.utils.templates import CompiledTemplate, MediaRef, compile_template
+
+logger = logging.getLogger(__name__)
+
+CATALOG_DIR = Path(__file__).parent
+MEDIA_DIR = CATALOG_DIR / "media"
+
+DEFAULT_LOCALE = "ru"
+
+
+class Catalog:
+    """A locale's compiled built-in templates and the words used around them."""
+
+    __slots__ = ("locale", "templates", "friend", "conjunction", "months")
+
+    def __init__(
+        self,
+        locale: str,
+        templates: tuple[CompiledTemplate, ...],
+        friend: str,
+        conjunction: str,
+        months: tuple[str, ...],
+    ) -> None:
+        self.locale = locale
+        self.templates = templates
+        self.friend = friend
+        self.conjunction = conjunction
+        self.months = months  # index 1-12
+
+    def month_name(self, month: int) -> str:
+        return self.months[month]
+
+
+@functools.cache
+def available_locales() -> tuple[str, ...]:
+    return tuple(sorted(path.stem for path in CATALOG_DIR.glob("*.json")))
+
+
+@functools.cache
+def load_catalog(locale: str) -> Catalog:
+    """Load and compile the catalog for ``locale``.
+
+    Raises KeyError if no catalog is installed for it.
+    """
+    if locale not in available_locales():
+        raise KeyError(locale)
+    with open(CATALOG_DIR / f"{locale}.json", encoding="utf-8") as f:
+        data = json.load(f)
+    months = data.get("months")
+    return Catalog(
+        locale=locale,
+        templates=tuple(_compile_entry(entry) for entry in data["templates"]),
+        friend=data["friend"],
+        conjunction=data["and"],
+        months=("", *months) if months else tuple(MONTH_NAMES),
+    )
+
+
+def get_catalog(locale: str) -> Catalog:
+    """The catalog for ``locale``, or the default one if it isn't installed."""
+    try:
+        return load_catalog(locale)
+    except KeyError:
+        return load_catalog(DEFAULT_LOCALE)
+
+
+def _compile_entry(entry: str | dict[str, Any]) -> CompiledTemplate:
+    if isinstance(entry, str):
+        return compile_template(entry)
+    media = None
+    spec = entry.get("media")
+    if spec:
+        path = MEDIA_DIR / spec["file"]
+        if path.is_file():
+            media = MediaRef(spec["type"], path)
+        else:
+            logger.warning("Greeting media %s not found; sending text only", path)
+    return compile_template(entry["text"], media)
@@ -11,10 +11,37 @@ load_dotenv()
 class Settings:
     bot_token: str
     bot_owner_id: int
+    telegram_api_url: str
     db_path: Path
+    db_read_pool_size: int
+    db_group_commit_ms: float
     default_timezone: str
     default_greeting_time: str
     log_level: str
+    tracking_flush_interval: float
+    tracking_batch_size: int
+    known_users_cache_size: int
+    known_users_cache_ttl: float
+    channel_cache_size: int
+    send_global_rate: float
+    send_chat_rate_per_min: float
+    send_concurrency: int
+    outbox_batch_size: int
+    outbox_max_attempts: int
+    catchup_grace_minutes: int
+    template_cache_size: int
+    membership_cache_ttl: float
+    membership_check_concurrency: int
+    birthday_page_cache_size: int
+    fsm_state_ttl: float
+    fsm_cache_size: int
+    run_mode: str
+    webhook_url: str
+    webhook_path: str
+    webhook_host: str
+    webhook_port: int
+    webhook_secret: str
+    webhook_max_concurrency: int
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -27,18 +54,88 @@ class Settings:
             raise ValueError("BOT_OWNER_ID environment variable is required")
         bot_owner_id = int(raw_owner)
 
+        telegram_api_url = os.getenv("TELEGRAM_API_URL", "")
         db_path = Path(os.getenv("DB_PATH", "data/birthdays.db"))
+        db_read_pool_size = int(os.getenv("DB_READ_POOL_SIZE", "4"))
+        db_group_commit_ms = float(os.getenv("DB_GROUP_COMMIT_MS", "0"))
         default_timezone = os.getenv("DEFAULT_TIMEZONE", "UTC")
         default_greeting_time = os.getenv("DEFAULT_GREETING_TIME", "09:00")
         log_level = os.getenv("LOG_LEVEL", "INFO")
+        tracking_flush_interval = float(os.getenv("TRACKING_FLUSH_INTERVAL", "5"))
+        tracking_batch_size = int(os.getenv("TRACKING_BATCH_SIZE", "500"))
+        known_users_cache_size = int(os.getenv("KNOWN_USERS_CACHE_SIZE", "10000"))
+        known_users_cache_ttl = float(os.getenv("KNOWN_USERS_CACHE_TTL", "3600"))
+        channel_cache_size = int(os.getenv("CHANNEL_CACHE_SIZE", "1000"))
+        send_global_rate = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+        send_chat_rate_per_min = float(os.getenv("SEND_CHAT_RATE_PER_MIN", "20"))
+        send_concurrency = int(os.getenv("SEND_CONCURRENCY", "8"))
+        outbox_batch_size = int(os.getenv("OUTBOX_BATCH_SIZE", "100"))
+        outbox_max_attempts = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "8"))
+        catchup_grace_minutes = int(os.getenv("CATCHUP_GRACE_MINUTES", "360"))
+        template_cache_size = int(os.getenv("TEMPLATE_CACHE_SIZE", "1000"))
+        membership_cache_ttl = float(os.getenv("MEMBERSHIP_CACHE_TTL", "600"))
+        membership_check_concurrency = int(
+            os.getenv("MEMBERSHIP_CHECK_CONCURRENCY", "10")
+        )
+        birthday_page_cache_size = int(os.getenv("BIRTHDAY_PAGE_CACHE_SIZE", "1000"))
+        fsm_state_ttl = float(os.getenv("FSM_STATE_TTL", "86400"))
+        fsm_cache_size = int(os.getenv("FSM_CACHE_SIZE", "1000"))
+
+        run_mode = os.getenv("RUN_MODE", "polling")
+        if run_mode not in ("polling", "webhook"):
+            raise ValueError(
+                f"RUN_MODE must be 'polling' or 'webhook', got {run_mode!r}"
+            )
+        webhook_url = os.getenv("WEBHOOK_URL", "")
+        if run_mode == "webhook" and not webhook_url:
+            raise ValueError(
+                "WEBHOOK_URL environment variable is required in webhook mode"
+            )
+        webhook_path = os.getenv("WEBHOOK_PATH", "/webhook")
+        webhook_host = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+        webhook_port = int(os.getenv("WEBHOOK_PORT", "8080"))
+        webhook_secret = os.getenv("WEBHOOK_SECRET", "")
+        webhook_max_concurrency = int(os.getenv("WEBHOOK_MAX_CONCURRENCY", "40"))
+        if webhook_max_concurrency < 1:
+            raise ValueError(
+                "WEBHOOK_MAX_CONCURRENCY must be at least 1, "
+                f"got {webhook_max_concurrency}"
+            )
 
         return cls(
             bot_token=bot_token,
             bot_owner_id=bot_owner_id,
+            telegram_api_url=telegram_api_url,
             db_path=db_path,
+            db_read_pool_size=db_read_pool_size,
+            db_group_commit_ms=db_group_commit_ms,
             default_timezone=default_timezone,
             default_greeting_time=default_greeting_time,
             log_level=log_level,
+            tracking_flush_interval=tracking_flush_interval,
+            tracking_batch_size=tracking_batch_size,
+            known_users_cache_size=known_users_cache_size,
+            known_users_cache_ttl=known_users_cache_ttl,
+            channel_cache_size=channel_cache_size,
+            send_global_rate=send_global_rate,
+            send_chat_rate_per_min=send_chat_rate_per_min,
+            send_concurrency=send_concurrency,
+            outbox_batch_size=outbox_batch_size,
+            outbox_max_attempts=outbox_max_attempts,
+            catchup_grace_minutes=catchup_grace_minutes,
+            template_cache_size=template_cache_size,
+            membership_cache_ttl=membership_cache_ttl,
+            membership_check_concurrency=membership_check_concurrency,
+            birthday_page_cache_size=birthday_page_cache_size,
+            fsm_state_ttl=fsm_state_ttl,
+            fsm_cache_size=fsm_cache_size,
+            run_mode=run_mode,
+            webhook_url=webhook_url,
+            webhook_path=webhook_path,
+            webhook_host=webhook_host,
+            webhook_port=webhook_port,
+            webhook_secret=webhook_secret,
+            webhook_max_concurrency=webhook_max_concurrency,
         )
 
 
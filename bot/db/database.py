@@ -1,5 +1,9 @@
+import asyncio
 import logging
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
 from pathlib import Path
+from typing import AsyncIterator, Callable
 
 import aiosqlite
 
@@ -47,32 +51,376 @@ CREATE TABLE IF NOT EXISTS known_users (
 
 """
 
+# Ordered list of (version, script). Each script runs in its own transaction
+# and is applied at most once; the current version is kept in schema_version.
+# Never edit a migration that has shipped, append a new one instead.
+MIGRATIONS: list[tuple[int, str]] = [
+    (1, SCHEMA),
+    (
+        2,
+        """
+        CREATE INDEX IF NOT EXISTS idx_birthdays_channel_date
+            ON birthdays (channel_id, birth_month, birth_day);
+
+        CREATE INDEX IF NOT EXISTS idx_admins_user
+            ON admins (user_id, channel_id);
+
+        CREATE INDEX IF NOT EXISTS idx_known_users_username
+            ON known_users (channel_id, username COLLATE NOCASE);
+        """,
+    ),
+    (
+        3,
+        """
+        CREATE TABLE IF NOT EXISTS greeting_outbox (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id      INTEGER NOT NULL,
+            user_id         INTEGER NOT NULL,
+            year            INTEGER NOT NULL,
+            username        TEXT,
+            first_name      TEXT,
+            birth_day       INTEGER NOT NULL,
+            birth_month     INTEGER NOT NULL,
+            attempts        INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL    NOT NULL,
+            claimed_until   REAL    NOT NULL DEFAULT 0,
+            last_error      TEXT,
+            created_at      TEXT    NOT NULL DEFAULT (datetime('now')),
+            UNIQUE(channel_id, user_id, year)
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_greeting_outbox_due
+            ON greeting_outbox (next_attempt_at);
+
+        CREATE TABLE IF NOT EXISTS greetings_sent (
+            channel_id      INTEGER NOT NULL,
+            user_id         INTEGER NOT NULL,
+            year            INTEGER NOT NULL,
+            sent_at         TEXT    NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (channel_id, user_id, year)
+        );
+        """,
+    ),
+    (
+        4,
+        """
+        CREATE TABLE IF NOT EXISTS bot_state (
+            key             TEXT PRIMARY KEY,
+            value           TEXT NOT NULL
+        );
+        """,
+    ),
+    (
+        5,
+        """
+        ALTER TABLE channels
+            ADD COLUMN combine_greetings INTEGER NOT NULL DEFAULT 0;
+        """,
+    ),
+    (
+        6,
+        """
+        CREATE TABLE IF NOT EXISTS greeting_templates (
+            id              INTEGER PRIMARY KEY AUTOINCREMENT,
+            channel_id      INTEGER NOT NULL REFERENCES channels(id),
+            text            TEXT    NOT NULL,
+            created_by      INTEGER NOT NULL,
+            created_at      TEXT    NOT NULL DEFAULT (datetime('now'))
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_greeting_templates_channel
+            ON greeting_templates (channel_id);
+        """,
+    ),
+    (
+        7,
+        """
+        CREATE TABLE IF NOT EXISTS template_rotation (
+            channel_id      INTEGER PRIMARY KEY,
+            seed            INTEGER NOT NULL,
+            cursor          INTEGER NOT NULL,
+            size            INTEGER NOT NULL
+        );
+        """,
+    ),
+    (
+        8,
+        """
+        ALTER TABLE channels ADD COLUMN locale TEXT NOT NULL DEFAULT 'ru';
+        """,
+    ),
+    (
+        9,
+        """
+        CREATE TABLE IF NOT EXISTS media_cache (
+            sha256          TEXT    NOT NULL,
+            kind            TEXT    NOT NULL,
+            file_id         TEXT    NOT NULL,
+            size            INTEGER NOT NULL,
+            created_at      TEXT    NOT NULL DEFAULT (datetime('now')),
+            PRIMARY KEY (sha256, kind)
+        );
+        """,
+    ),
+    (
+        10,
+        """
+        ALTER TABLE channels ADD COLUMN active INTEGER NOT NULL DEFAULT 1;
+        """,
+    ),
+    (
+        11,
+        """
+        CREATE INDEX IF NOT EXISTS idx_channels_title
+            ON channels (title COLLATE NOCASE);
+        """,
+    ),
+    (
+        12,
+        """
+        -- Day of a leap year (1-366): 29 February keeps its own slot (60)
+        ALTER TABLE birthdays ADD COLUMN day_of_year INTEGER NOT NULL DEFAULT 0;
+
+        UPDATE birthdays SET day_of_year = birth_day + CASE birth_month
+            WHEN 1 THEN 0    WHEN 2 THEN 31   WHEN 3 THEN 60   WHEN 4 THEN 91
+            WHEN 5 THEN 121  WHEN 6 THEN 152  WHEN 7 THEN 182  WHEN 8 THEN 213
+            WHEN 9 THEN 244  WHEN 10 THEN 274 WHEN 11 THEN 305 ELSE 335
+        END;
+
+        CREATE INDEX IF NOT EXISTS idx_birthdays_channel_doy
+            ON birthdays (channel_id, day_of_year);
+        """,
+    ),
+    (
+        13,
+        """
+        -- aiogram FSM state and data per storage key (bot:chat:user)
+        CREATE TABLE IF NOT EXISTS fsm_storage (
+            key             TEXT PRIMARY KEY,
+            state           TEXT,
+            data            TEXT    NOT NULL DEFAULT '{}',
+            updated_at      REAL    NOT NULL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_fsm_storage_updated
+            ON fsm_storage (updated_at);
+        """,
+    ),
+]
+
+
+class _Transaction:
+    """Bookkeeping for the transaction the current task is running in."""
+
+    __slots__ = ("on_commit",)
+
+    def __init__(self) -> None:
+        self.on_commit: list[Callable[[], None]] = []
+
+
+class _CommitGroup:
+    """Writers sharing a single COMMIT in group-commit mode."""
+
+    __slots__ = ("committed", "size")
+
+    def __init__(self) -> None:
+        self.committed: asyncio.Future[None] = (
+            asyncio.get_running_loop().create_future()
+        )
+        self.size = 0
+
+
+_current_tx: ContextVar[_Transaction | None] = ContextVar("current_tx", default=None)
+
 
 class Database:
-    def __init__(self, db_path: Path) -> None:
+    """SQLite access with one serialized writer and a pool of readers.
+
+    All writes go through ``transaction()`` on a single connection guarded
+    by a lock. Reads are served by ``read_pool_size`` read-only connections,
+    which in WAL mode run concurrently with the writer. With a pool size of
+    0, reads share the writer connection.
+
+    With ``group_commit_window`` > 0, transactions that start within that
+    many seconds of each other share one COMMIT; each still rolls back on
+    its own through a savepoint and returns only once the shared commit
+    has succeeded.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        read_pool_size: int = 4,
+        group_commit_window: float = 0,
+    ) -> None:
         self._db_path = db_path
+        self._read_pool_size = read_pool_size
+        self._group_commit_window = group_commit_window
         self._conn: aiosqlite.Connection | None = None
+        self._readers: list[aiosqlite.Connection] = []
+        self._idle_readers: asyncio.Queue[aiosqlite.Connection] = asyncio.Queue()
+        self._write_lock = asyncio.Lock()
+        self._group: _CommitGroup | None = None
+        self.transactions = 0
+        self.commits = 0
 
     async def connect(self) -> None:
         self._db_path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = await aiosqlite.connect(self._db_path)
+        # Autocommit mode: transactions are started explicitly in transaction()
+        self._conn = await aiosqlite.connect(self._db_path, isolation_level=None)
         self._conn.row_factory = aiosqlite.Row
         await self._conn.execute("PRAGMA journal_mode=WAL")
         await self._conn.execute("PRAGMA foreign_keys=ON")
         await self._migrate()
-        logger.info("Database connected: %s", self._db_path)
+
+        uri = f"{self._db_path.resolve().as_uri()}?mode=ro"
+        for _ in range(self._read_pool_size):
+            reader = await aiosqlite.connect(uri, uri=True)
+            reader.row_factory = aiosqlite.Row
+            self._readers.append(reader)
+            self._idle_readers.put_nowait(reader)
+        logger.info(
+            "Database connected: %s (%d readers)", self._db_path, len(self._readers)
+        )
 
     async def disconnect(self) -> None:
+        if self._group is not None:
+            await asyncio.wait([self._group.committed])
+        for reader in self._readers:
+            await reader.close()
+        self._readers.clear()
         if self._conn:
             await self._conn.close()
-            logger.info("Database disconnected")
+            logger.info(
+                "Database disconnected (%d transactions, %d commits)",
+                self.transactions,
+                self.commits,
+            )
 
     @property
     def conn(self) -> aiosqlite.Connection:
+        """The writer connection."""
         if self._conn is None:
             raise RuntimeError("Database is not connected")
         return self._conn
 
+    @asynccontextmanager
+    async def reader(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Borrow a read-only connection from the pool.
+
+        Inside a transaction the writer connection is returned instead, so
+        the caller sees its own uncommitted writes.
+        """
+        if not self._readers or _current_tx.get() is not None:
+            yield self.conn
+            return
+        conn = await self._idle_readers.get()
+        try:
+            yield conn
+        finally:
+            self._idle_readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def transaction(self) -> AsyncIterator[aiosqlite.Connection]:
+        """Run the block as one atomic unit on the writer connection.
+
+        Nested calls join the outermost transaction, so several repository
+        calls can be grouped into a single commit.
+        """
+        if _current_tx.get() is not None:
+            yield self.conn
+            return
+
+        tx = _Transaction()
+        token = _current_tx.set(tx)
+        try:
+            if self._group_commit_window > 0:
+                async with self._grouped(tx) as conn:
+                    yield conn
+            else:
+                async with self._write_lock:
+                    await self.conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        yield self.conn
+                    except BaseException:
+                        await self.conn.execute("ROLLBACK")
+                        raise
+                    await self.conn.execute("COMMIT")
+                    self.commits += 1
+        finally:
+            _current_tx.reset(token)
+        self.transactions += 1
+        for callback in tx.on_commit:
+            callback()
+
+    @property
+    def in_transaction(self) -> bool:
+        """Whether the current task is inside ``transaction()``."""
+        return _current_tx.get() is not None
+
+    def on_commit(self, callback: Callable[[], None]) -> None:
+        """Call ``callback`` once the current transaction commits.
+
+        Outside a transaction the callback runs immediately.
+        """
+        tx = _current_tx.get()
+        if tx is None:
+            callback()
+        else:
+            tx.on_commit.append(callback)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"transactions": self.transactions, "commits": self.commits}
+
+    @asynccontextmanager
+    async def _grouped(self, tx: _Transaction) -> AsyncIterator[aiosqlite.Connection]:
+        async with self._write_lock:
+            group = self._group
+            if group is None:
+                await self.conn.execute("BEGIN IMMEDIATE")
+                group = self._group = _CommitGroup()
+                asyncio.create_task(self._commit_group(group))
+            await self.conn.execute("SAVEPOINT tx")
+            try:
+                yield self.conn
+            except BaseException:
+                await self.conn.execute("ROLLBACK TO tx")
+                await self.conn.execute("RELEASE tx")
+                raise
+            await self.conn.execute("RELEASE tx")
+            group.size += 1
+        await asyncio.shield(group.committed)
+
+    async def _commit_group(self, group: _CommitGroup) -> None:
+        await asyncio.sleep(self._group_commit_window)
+        async with self._write_lock:
+            self._group = None
+            try:
+                await self.conn.execute("COMMIT")
+            except Exception as e:
+                await self.conn.execute("ROLLBACK")
+                group.committed.set_exception(e)
+                return
+            self.commits += 1
+        logger.debug("Group commit of %d transactions", group.size)
+        group.committed.set_result(None)
+
     async def _migrate(self) -> None:
-        await self._conn.executescript(SCHEMA)
+        await self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS schema_version (version INTEGER NOT NULL)"
+        )
+        cursor = await self._conn.execute("SELECT MAX(version) FROM schema_version")
+        row = await cursor.fetchone()
+        current = row[0] or 0
         await self._conn.commit()
+
+        for version, script in MIGRATIONS:
+            if version <= current:
+                continue
+            await self._conn.executescript(
+                f"BEGIN;\n{script}\n"
+                f"INSERT INTO schema_version (version) VALUES ({version});\n"
+                "COMMIT;"
+            )
+            logger.info("Applied database migration %d", version)
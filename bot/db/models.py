@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import sqlite3
+from typing import Any, Callable, NamedTuple, TypeVar
+
+T = TypeVar("T", bound=tuple)
+
+
+class Channel(NamedTuple):
+    id: int
+    title: str | None
+    timezone: str
+    greeting_time: str
+    created_at: str
+    combine_greetings: int  # 1: one message for all of a day's birthdays
+    locale: str
+    active: int  # 0 once the bot has been removed from the chat
+
+
+class Birthday(NamedTuple):
+    id: int
+    channel_id: int
+    user_id: int
+    username: str | None
+    first_name: str | None
+    birth_day: int
+    birth_month: int
+    set_by: int
+    created_at: str
+
+
+class Admin(NamedTuple):
+    id: int
+    channel_id: int
+    user_id: int
+    granted_by: int
+    created_at: str
+
+
+class KnownUser(NamedTuple):
+    user_id: int
+    channel_id: int
+    username: str | None
+    first_name: str | None
+    updated_at: str
+
+
+class OutboxEntry(NamedTuple):
+    id: int
+    channel_id: int
+    user_id: int
+    year: int
+    username: str | None
+    first_name: str | None
+    birth_day: int
+    birth_month: int
+    attempts: int
+
+
+class GreetingTemplate(NamedTuple):
+    id: int
+    channel_id: int
+    text: str
+    created_by: int
+    created_at: str
+
+
+def row_factory(model: type[T]) -> Callable[[sqlite3.Cursor, tuple[Any, ...]], T]:
+    """Build a cursor row factory that creates ``model`` straight from row tuples.
+
+    The query must select the model's fields in declaration order.
+    """
+
+    def factory(_cursor: sqlite3.Cursor, row: tuple[Any, ...]) -> T:
+        return model(*row)
+
+    return factory
+
+
+def columns(model: type[tuple], alias: str = "") -> str:
+    """Comma-separated column list for ``model``, optionally table-qualified."""
+    prefix = f"{alias}." if alias else ""
+    return ", ".join(f"{prefix}{name}" for name in model._fields)
@@ -1,69 +1,301 @@
 from __future__ import annotations
 
-from typing import Any
+from contextlib import AbstractAsyncContextManager
+from typing import Any, TypeVar
+
+from bot.utils.cache import LRUCache
+from bot.utils.date_helpers import day_of_year
 
 from .database import Database
+from .models import (
+    Birthday,
+    Channel,
+    GreetingTemplate,
+    KnownUser,
+    OutboxEntry,
+    columns,
+    row_factory,
+)
+
+T = TypeVar("T", bound=tuple)
+
+# (channel_id, day, month) triples per bulk date query; 3 parameters each
+# keeps a chunk under SQLite's historical 999-parameter limit.
+_DUE_CHUNK = 300
+
+# Tables holding per-channel rows, keyed by ``channel_id``
+_CHANNEL_TABLES = (
+    "birthdays",
+    "admins",
+    "known_users",
+    "greeting_outbox",
+    "greetings_sent",
+    "greeting_templates",
+    "template_rotation",
+)
+
+# Birthday rows with names and usernames refreshed from known_users
+_BIRTHDAY_SELECT = """
+    SELECT b.id, b.channel_id, b.user_id,
+           COALESCE(k.username, b.username)     AS username,
+           COALESCE(k.first_name, b.first_name) AS first_name,
+           b.birth_day, b.birth_month, b.set_by, b.created_at
+    FROM birthdays b
+    LEFT JOIN known_users k
+        ON k.user_id = b.user_id AND k.channel_id = b.channel_id
+"""
 
 
 class Repository:
-    def __init__(self, db: Database) -> None:
+    """All database access.
+
+    Rows are returned as the typed records from ``bot.db.models``. Read
+    methods run on the reader pool (``Database.reader``); methods that
+    modify data each run in their own ``Database.transaction``, or join the
+    caller's one when wrapped in ``Repository.transaction()``.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        *,
+        known_users_cache_size: int = 10_000,
+        known_users_cache_ttl: float = 3600,
+        channel_cache_size: int = 1000,
+    ) -> None:
         self._db = db
+        # chat_id -> channel row; invalidated by every channel write
+        self.channel_cache: LRUCache[int, Channel] = LRUCache(
+            channel_cache_size
+        )
+        # chat_id -> counter bumped by every channel write, so a read that
+        # overlaps a write doesn't cache the row it read
+        self._channel_versions: dict[int, int] = {}
+        # (user_id, channel_id) -> last persisted (username, first_name)
+        self.known_users_cache: LRUCache[
+            tuple[int, int], tuple[str | None, str | None]
+        ] = LRUCache(known_users_cache_size, known_users_cache_ttl)
+        # channel_id -> counter bumped by every write that changes how the
+        # channel's birthday list renders (birthdays or known_users rows)
+        self._birthday_versions: dict[int, int] = {}
+
+    def transaction(self) -> AbstractAsyncContextManager[Any]:
+        """Group several repository calls into one atomic commit."""
+        return self._db.transaction()
+
+    def cache_stats(self) -> dict[str, dict[str, Any]]:
+        return {
+            "channels": self.channel_cache.stats,
+            "known_users": self.known_users_cache.stats,
+        }
+
+    async def _fetch_one(
+        self, model: type[T], sql: str, params: tuple[Any, ...] = ()
+    ) -> T | None:
+        async with self._db.reader() as conn:
+            cursor = await conn.execute(sql, params)
+            cursor.row_factory = row_factory(model)
+            return await cursor.fetchone()
+
+    async def _fetch_all(
+        self, model: type[T], sql: str, params: tuple[Any, ...] = ()
+    ) -> list[T]:
+        async with self._db.reader() as conn:
+            cursor = await conn.execute(sql, params)
+            cursor.row_factory = row_factory(model)
+            return await cursor.fetchall()
+
+    def _invalidate_channel(self, chat_id: int) -> None:
+        # Drop now so reads later in this transaction miss the cache, and
+        # again on commit in case a concurrent reader re-cached the old row.
+        # The version bump stops readers still in flight from caching it.
+        def drop() -> None:
+            self.channel_cache.pop(chat_id)
+            self._channel_versions[chat_id] = (
+                self._channel_versions.get(chat_id, 0) + 1
+            )
+
+        drop()
+        self._db.on_commit(drop)
+
+    def birthdays_version(self, channel_id: int) -> int:
+        """Version of a channel's birthday list, for caching rendered output."""
+        return self._birthday_versions.get(channel_id, 0)
+
+    def _touch_birthdays(self, *channel_ids: int) -> None:
+        # Bump now and again on commit, like _invalidate_channel, so output
+        # rendered from rows read before the commit is never current.
+        def bump() -> None:
+            for channel_id in channel_ids:
+                self._birthday_versions[channel_id] = (
+                    self._birthday_versions.get(channel_id, 0) + 1
+                )
+
+        bump()
+        self._db.on_commit(bump)
 
     # ── Channels ──────────────────────────────────────────────────────
 
     async def upsert_channel(
         self, chat_id: int, title: str | None, timezone: str, greeting_time: str
     ) -> None:
-        await self._db.conn.execute(
-            """
-            INSERT INTO channels (id, title, timezone, greeting_time)
-            VALUES (?, ?, ?, ?)
-            ON CONFLICT(id) DO UPDATE SET title = excluded.title
-            """,
-            (chat_id, title, timezone, greeting_time),
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO channels (id, title, timezone, greeting_time)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET title = excluded.title, active = 1
+                """,
+                (chat_id, title, timezone, greeting_time),
+            )
+        self._invalidate_channel(chat_id)
+
+    async def get_channel(self, chat_id: int) -> Channel | None:
+        channel = self.channel_cache.get(chat_id)
+        if channel is not None:
+            return channel
+        version = self._channel_versions.get(chat_id, 0)
+        channel = await self._fetch_one(
+            Channel,
+            f"SELECT {columns(Channel)} FROM channels WHERE id = ?",
+            (chat_id,),
         )
-        await self._db.conn.commit()
+        # Rows read inside a transaction may not be committed yet, and a
+        # write committed during the read may have made this row stale
+        if (
+            channel is not None
+            and not self._db.in_transaction
+            and self._channel_versions.get(chat_id, 0) == version
+        ):
+            self.channel_cache.set(chat_id, channel)
+        return channel
 
-    async def get_channel(self, chat_id: int) -> dict[str, Any] | None:
-        cursor = await self._db.conn.execute(
-            "SELECT * FROM channels WHERE id = ?", (chat_id,)
+    async def get_all_channels(self) -> list[Channel]:
+        return await self._fetch_all(
+            Channel, f"SELECT {columns(Channel)} FROM channels WHERE active = 1"
         )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
 
-    async def get_all_channels(self) -> list[dict[str, Any]]:
-        cursor = await self._db.conn.execute("SELECT * FROM channels")
-        return [dict(r) for r in await cursor.fetchall()]
+    async def deactivate_channel(self, chat_id: int) -> bool:
+        """Mark a channel the bot has left; its data is kept for a re-add.
 
-    async def remove_channel(self, chat_id: int) -> None:
-        await self._db.conn.execute(
-            "DELETE FROM birthdays WHERE channel_id = ?", (chat_id,)
-        )
-        await self._db.conn.execute(
-            "DELETE FROM admins WHERE channel_id = ?", (chat_id,)
-        )
-        await self._db.conn.execute(
-            "DELETE FROM known_users WHERE channel_id = ?", (chat_id,)
+        Pending greetings for it are dropped. Returns False if the channel
+        is unknown or already inactive.
+        """
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                "UPDATE channels SET active = 0 WHERE id = ? AND active = 1",
+                (chat_id,),
+            )
+            if cursor.rowcount == 0:
+                return False
+            await conn.execute(
+                "DELETE FROM greeting_outbox WHERE channel_id = ?", (chat_id,)
+            )
+        self._invalidate_channel(chat_id)
+        return True
+
+    async def migrate_channel(self, old_id: int, new_id: int) -> bool:
+        """Re-key a group's settings and data to the supergroup it became.
+
+        The group's settings replace those of the new chat (which may have
+        been registered with defaults when the bot was added to it); rows
+        the new chat already has take precedence. Returns False if ``old_id`` is not
+        registered.
+        """
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                "SELECT 1 FROM channels WHERE id = ?", (old_id,)
+            )
+            if await cursor.fetchone() is None:
+                return False
+            # The group's settings win over the defaults the new chat got
+            await conn.execute(
+                """
+                INSERT INTO channels (id, title, timezone, greeting_time,
+                                      created_at, combine_greetings, locale)
+                SELECT ?, title, timezone, greeting_time,
+                       created_at, combine_greetings, locale
+                FROM channels WHERE id = ?
+                ON CONFLICT(id) DO UPDATE SET
+                    timezone = excluded.timezone,
+                    greeting_time = excluded.greeting_time,
+                    created_at = excluded.created_at,
+                    combine_greetings = excluded.combine_greetings,
+                    locale = excluded.locale,
+                    active = 1
+                """,
+                (new_id, old_id),
+            )
+            for table in _CHANNEL_TABLES:
+                await conn.execute(
+                    f"UPDATE OR IGNORE {table} SET channel_id = ? "
+                    "WHERE channel_id = ?",
+                    (new_id, old_id),
+                )
+                await conn.execute(
+                    f"DELETE FROM {table} WHERE channel_id = ?", (old_id,)
+                )
+            await conn.execute("DELETE FROM channels WHERE id = ?", (old_id,))
+        self._invalidate_channel(old_id)
+        self._invalidate_channel(new_id)
+        self._touch_birthdays(old_id, new_id)
+        self._db.on_commit(
+            lambda: self.known_users_cache.discard_where(
+                lambda key: key[1] in (old_id, new_id)
+            )
         )
-        await self._db.conn.execute(
-            "DELETE FROM channels WHERE id = ?", (chat_id,)
+        return True
+
+    async def remove_channel(self, chat_id: int) -> None:
+        async with self._db.transaction() as conn:
+            for table in _CHANNEL_TABLES:
+                await conn.execute(
+                    f"DELETE FROM {table} WHERE channel_id = ?", (chat_id,)
+                )
+            await conn.execute(
+                "DELETE FROM channels WHERE id = ?", (chat_id,)
+            )
+        self._invalidate_channel(chat_id)
+        self._touch_birthdays(chat_id)
+        self._db.on_commit(
+            lambda: self.known_users_cache.discard_where(
+                lambda key: key[1] == chat_id
+            )
         )
-        await self._db.conn.commit()
 
     async def update_channel_timezone(self, chat_id: int, timezone: str) -> None:
-        await self._db.conn.execute(
-            "UPDATE channels SET timezone = ? WHERE id = ?", (timezone, chat_id)
-        )
-        await self._db.conn.commit()
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "UPDATE channels SET timezone = ? WHERE id = ?", (timezone, chat_id)
+            )
+        self._invalidate_channel(chat_id)
 
     async def update_channel_greeting_time(
         self, chat_id: int, greeting_time: str
     ) -> None:
-        await self._db.conn.execute(
-            "UPDATE channels SET greeting_time = ? WHERE id = ?",
-            (greeting_time, chat_id),
-        )
-        await self._db.conn.commit()
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "UPDATE channels SET greeting_time = ? WHERE id = ?",
+                (greeting_time, chat_id),
+            )
+        self._invalidate_channel(chat_id)
+
+    async def update_channel_combine_greetings(
+        self, chat_id: int, combine: bool
+    ) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "UPDATE channels SET combine_greetings = ? WHERE id = ?",
+                (int(combine), chat_id),
+            )
+        self._invalidate_channel(chat_id)
+
+    async def update_channel_locale(self, chat_id: int, locale: str) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "UPDATE channels SET locale = ? WHERE id = ?", (locale, chat_id)
+            )
+        self._invalidate_channel(chat_id)
 
     # ── Birthdays ─────────────────────────────────────────────────────
 
@@ -77,74 +309,159 @@ class Repository:
         birth_month: int,
         set_by: int,
     ) -> None:
-        await self._db.conn.execute(
-            """
-            INSERT INTO birthdays (channel_id, user_id, username, first_name,
-                                   birth_day, birth_month, set_by)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-            ON CONFLICT(channel_id, user_id) DO UPDATE SET
-                username = excluded.username,
-                first_name = excluded.first_name,
-                birth_day = excluded.birth_day,
-                birth_month = excluded.birth_month,
-                set_by = excluded.set_by
-            """,
-            (channel_id, user_id, username, first_name, birth_day, birth_month, set_by),
-        )
-        await self._db.conn.commit()
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO birthdays (channel_id, user_id, username, first_name,
+                                       birth_day, birth_month, set_by, day_of_year)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(channel_id, user_id) DO UPDATE SET
+                    username = excluded.username,
+                    first_name = excluded.first_name,
+                    birth_day = excluded.birth_day,
+                    birth_month = excluded.birth_month,
+                    set_by = excluded.set_by,
+                    day_of_year = excluded.day_of_year
+                """,
+                (
+                    channel_id,
+                    user_id,
+                    username,
+                    first_name,
+                    birth_day,
+                    birth_month,
+                    set_by,
+                    day_of_year(birth_day, birth_month),
+                ),
+            )
+        self._touch_birthdays(channel_id)
 
     async def get_birthday(
         self, channel_id: int, user_id: int
-    ) -> dict[str, Any] | None:
-        cursor = await self._db.conn.execute(
-            "SELECT * FROM birthdays WHERE channel_id = ? AND user_id = ?",
+    ) -> Birthday | None:
+        return await self._fetch_one(
+            Birthday,
+            f"""
+            SELECT {columns(Birthday)} FROM birthdays
+            WHERE channel_id = ? AND user_id = ?
+            """,
             (channel_id, user_id),
         )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
-
-    async def get_birthdays_for_channel(
-        self, channel_id: int
-    ) -> list[dict[str, Any]]:
-        cursor = await self._db.conn.execute(
-            """
-            SELECT b.*,
-                   COALESCE(k.first_name, b.first_name) AS first_name,
-                   COALESCE(k.username, b.username)     AS username
-            FROM birthdays b
-            LEFT JOIN known_users k
-                ON k.user_id = b.user_id AND k.channel_id = b.channel_id
-            WHERE b.channel_id = ?
-            ORDER BY b.birth_month, b.birth_day
+
+    async def get_birthdays_page(
+        self,
+        channel_id: int,
+        after: tuple[int, int, int] | None = None,
+        before: tuple[int, int, int] | None = None,
+        limit: int = 25,
+    ) -> list[Birthday]:
+        """Up to ``limit`` birthdays in date order, after or before a cursor.
+
+        Cursors are (birth_month, birth_day, id) of the last (or first) row
+        of the neighbouring page; each page is one range read of
+        ``idx_birthdays_channel_date``, which ends in the row ID.
+        """
+        conditions, params = ["b.channel_id = ?"], [channel_id]
+        if after is not None:
+            conditions.append("(b.birth_month, b.birth_day, b.id) > (?, ?, ?)")
+            params.extend(after)
+        if before is not None:
+            conditions.append("(b.birth_month, b.birth_day, b.id) < (?, ?, ?)")
+            params.extend(before)
+        order = "DESC" if before is not None else "ASC"
+        rows = await self._fetch_all(
+            Birthday,
+            _BIRTHDAY_SELECT
+            + f"""
+            WHERE {" AND ".join(conditions)}
+            ORDER BY b.birth_month {order}, b.birth_day {order}, b.id {order}
+            LIMIT ?
             """,
-            (channel_id,),
+            (*params, limit),
         )
-        return [dict(r) for r in await cursor.fetchall()]
+        return rows[::-1] if before is not None else rows
 
     async def get_birthdays_by_date(
         self, channel_id: int, day: int, month: int
-    ) -> list[dict[str, Any]]:
-        cursor = await self._db.conn.execute(
-            """
-            SELECT b.*,
-                   COALESCE(k.first_name, b.first_name) AS first_name,
-                   COALESCE(k.username, b.username)     AS username
-            FROM birthdays b
-            LEFT JOIN known_users k
-                ON k.user_id = b.user_id AND k.channel_id = b.channel_id
+    ) -> list[Birthday]:
+        return await self._fetch_all(
+            Birthday,
+            _BIRTHDAY_SELECT
+            + """
             WHERE b.channel_id = ?
                 AND b.birth_day = ? AND b.birth_month = ?
             """,
             (channel_id, day, month),
         )
-        return [dict(r) for r in await cursor.fetchall()]
 
-    async def remove_birthday(self, channel_id: int, user_id: int) -> bool:
-        cursor = await self._db.conn.execute(
-            "DELETE FROM birthdays WHERE channel_id = ? AND user_id = ?",
-            (channel_id, user_id),
+    async def get_birthdays_by_dates(
+        self, due: list[tuple[int, int, int]]
+    ) -> dict[int, list[Birthday]]:
+        """Birthdays for many (channel_id, day, month) triples, grouped by channel.
+
+        Each chunk of triples is matched in a single statement by joining
+        against a VALUES list, so a burst of channels costs a handful of
+        queries instead of one per channel.
+        """
+        grouped: dict[int, list[Birthday]] = {}
+        for start in range(0, len(due), _DUE_CHUNK):
+            chunk = due[start : start + _DUE_CHUNK]
+            values = ", ".join(["(?, ?, ?)"] * len(chunk))
+            rows = await self._fetch_all(
+                Birthday,
+                f"""
+                WITH due (channel_id, birth_day, birth_month) AS (VALUES {values})
+                SELECT b.id, b.channel_id, b.user_id,
+                       COALESCE(k.username, b.username)     AS username,
+                       COALESCE(k.first_name, b.first_name) AS first_name,
+                       b.birth_day, b.birth_month, b.set_by, b.created_at
+                FROM due
+                JOIN birthdays b
+                    ON b.channel_id = due.channel_id
+                    AND b.birth_month = due.birth_month
+                    AND b.birth_day = due.birth_day
+                LEFT JOIN known_users k
+                    ON k.user_id = b.user_id AND k.channel_id = b.channel_id
+                """,
+                tuple(value for triple in chunk for value in triple),
+            )
+            for bd in rows:
+                grouped.setdefault(bd.channel_id, []).append(bd)
+        return grouped
+
+    async def get_upcoming_birthdays(
+        self, channel_id: int, first: int, last: int, limit: int = 50
+    ) -> list[Birthday]:
+        """Birthdays whose ``day_of_year`` is in first..last, in calendar order.
+
+        ``first > last`` wraps past the end of the year: first..366 comes
+        before 1..last. Either way the rows are read from at most two
+        ranges of ``idx_birthdays_channel_doy``.
+        """
+        if first <= last:
+            ranges = (first, last, 1, 0)  # the second range is empty
+        else:
+            ranges = (first, 366, 1, last)
+        return await self._fetch_all(
+            Birthday,
+            _BIRTHDAY_SELECT
+            + """
+            WHERE b.channel_id = ?
+              AND (b.day_of_year BETWEEN ? AND ? OR b.day_of_year BETWEEN ? AND ?)
+            ORDER BY b.day_of_year < ?, b.day_of_year, b.id
+            LIMIT ?
+            """,
+            (channel_id, *ranges, first, limit),
         )
-        await self._db.conn.commit()
+
+    async def remove_birthday(self, channel_id: int, user_id: int) -> bool:
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM birthdays WHERE channel_id = ? AND user_id = ?",
+                (channel_id, user_id),
+            )
+            if cursor.rowcount > 0:
+                self._touch_birthdays(channel_id)
         return cursor.rowcount > 0
 
     async def update_birthday_user_info(
@@ -154,14 +471,16 @@ class Repository:
         username: str | None,
         first_name: str | None,
     ) -> bool:
-        cursor = await self._db.conn.execute(
-            """
-            UPDATE birthdays SET username = ?, first_name = ?
-            WHERE channel_id = ? AND user_id = ?
-            """,
-            (username, first_name, channel_id, user_id),
-        )
-        await self._db.conn.commit()
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                """
+                UPDATE birthdays SET username = ?, first_name = ?
+                WHERE channel_id = ? AND user_id = ?
+                """,
+                (username, first_name, channel_id, user_id),
+            )
+            if cursor.rowcount > 0:
+                self._touch_birthdays(channel_id)
         return cursor.rowcount > 0
 
     # ── Admins ────────────────────────────────────────────────────────
@@ -169,44 +488,113 @@ class Repository:
     async def add_admin(
         self, channel_id: int, user_id: int, granted_by: int
     ) -> None:
-        await self._db.conn.execute(
-            """
-            INSERT INTO admins (channel_id, user_id, granted_by)
-            VALUES (?, ?, ?)
-            ON CONFLICT(channel_id, user_id) DO NOTHING
-            """,
-            (channel_id, user_id, granted_by),
-        )
-        await self._db.conn.commit()
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO admins (channel_id, user_id, granted_by)
+                VALUES (?, ?, ?)
+                ON CONFLICT(channel_id, user_id) DO NOTHING
+                """,
+                (channel_id, user_id, granted_by),
+            )
 
     async def remove_admin(self, channel_id: int, user_id: int) -> bool:
-        cursor = await self._db.conn.execute(
-            "DELETE FROM admins WHERE channel_id = ? AND user_id = ?",
-            (channel_id, user_id),
-        )
-        await self._db.conn.commit()
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM admins WHERE channel_id = ? AND user_id = ?",
+                (channel_id, user_id),
+            )
         return cursor.rowcount > 0
 
     async def is_admin(self, channel_id: int, user_id: int) -> bool:
-        cursor = await self._db.conn.execute(
-            "SELECT 1 FROM admins WHERE channel_id = ? AND user_id = ?",
-            (channel_id, user_id),
+        async with self._db.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT 1 FROM admins WHERE channel_id = ? AND user_id = ?",
+                (channel_id, user_id),
+            )
+            return await cursor.fetchone() is not None
+
+    async def get_channels_page(
+        self,
+        admin_id: int | None = None,
+        after: int | None = None,
+        before: int | None = None,
+        limit: int = 10,
+    ) -> list[Channel]:
+        """Up to ``limit`` active channels in ID order, after or before a cursor.
+
+        ``admin_id`` restricts the page to channels that user administers;
+        ``None`` lists all channels. The cursor is the ID of the last (or
+        first) channel of the neighbouring page, so every page is an index
+        range read no matter how many channels exist.
+        """
+        if admin_id is None:
+            key, join, conditions, params = "c.id", "", ["c.active = 1"], []
+        else:
+            key = "a.channel_id"
+            join = "JOIN admins a ON a.channel_id = c.id"
+            conditions = ["a.user_id = ?", "c.active = 1"]
+            params = [admin_id]
+        if after is not None:
+            conditions.append(f"{key} > ?")
+            params.append(after)
+        if before is not None:
+            conditions.append(f"{key} < ?")
+            params.append(before)
+        order = "DESC" if before is not None else "ASC"
+        rows = await self._fetch_all(
+            Channel,
+            f"""
+            SELECT {columns(Channel, "c")} FROM channels c {join}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY {key} {order}
+            LIMIT ?
+            """,
+            (*params, limit),
         )
-        return await cursor.fetchone() is not None
-
-    async def get_admin_channels(self, user_id: int) -> list[dict[str, Any]]:
-        cursor = await self._db.conn.execute(
-            """
-            SELECT c.* FROM channels c
-            JOIN admins a ON a.channel_id = c.id
-            WHERE a.user_id = ?
+        return rows[::-1] if before is not None else rows
+
+    async def search_channels(
+        self, prefix: str, admin_id: int | None = None, limit: int = 10
+    ) -> list[Channel]:
+        """Active channels whose title starts with ``prefix``, by title.
+
+        Case-insensitive for ASCII letters (``COLLATE NOCASE``); served by
+        ``idx_channels_title``.
+        """
+        join, params = "", []
+        if admin_id is not None:
+            join = "JOIN admins a ON a.channel_id = c.id AND a.user_id = ?"
+            params = [admin_id]
+        return await self._fetch_all(
+            Channel,
+            f"""
+            SELECT {columns(Channel, "c")} FROM channels c {join}
+            WHERE c.active = 1
+              AND c.title >= ? COLLATE NOCASE AND c.title < ? COLLATE NOCASE
+            ORDER BY c.title COLLATE NOCASE, c.id
+            LIMIT ?
             """,
-            (user_id,),
+            (*params, prefix, prefix + "\U0010ffff", limit),
         )
-        return [dict(r) for r in await cursor.fetchall()]
 
     # ── Known Users ────────────────────────────────────────────────────
 
+    def is_known_user_current(
+        self,
+        user_id: int,
+        channel_id: int,
+        username: str | None,
+        first_name: str | None,
+    ) -> bool:
+        """Return True if the stored known_users row already has these values.
+
+        Answered from the in-memory cache only; a miss or expired entry
+        returns False so the caller writes the row again.
+        """
+        cached = self.known_users_cache.get((user_id, channel_id))
+        return cached == (username, first_name)
+
     async def upsert_known_user(
         self,
         user_id: int,
@@ -214,39 +602,365 @@ class Repository:
         username: str | None,
         first_name: str | None,
     ) -> None:
-        await self._db.conn.execute(
-            """
-            INSERT INTO known_users (user_id, channel_id, username, first_name, updated_at)
-            VALUES (?, ?, ?, ?, datetime('now'))
-            ON CONFLICT(user_id, channel_id) DO UPDATE SET
-                username = excluded.username,
-                first_name = excluded.first_name,
-                updated_at = excluded.updated_at
-            """,
-            (user_id, channel_id, username, first_name),
+        if self.is_known_user_current(user_id, channel_id, username, first_name):
+            return
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO known_users (user_id, channel_id, username, first_name, updated_at)
+                VALUES (?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(user_id, channel_id) DO UPDATE SET
+                    username = excluded.username,
+                    first_name = excluded.first_name,
+                    updated_at = excluded.updated_at
+                """,
+                (user_id, channel_id, username, first_name),
+            )
+        self._touch_birthdays(channel_id)
+        self._db.on_commit(
+            lambda: self.known_users_cache.set(
+                (user_id, channel_id), (username, first_name)
+            )
         )
-        await self._db.conn.commit()
+
+    async def upsert_known_users(
+        self, rows: list[tuple[int, int, str | None, str | None]]
+    ) -> None:
+        """Upsert many (user_id, channel_id, username, first_name) rows at once."""
+        async with self._db.transaction() as conn:
+            await conn.executemany(
+                """
+                INSERT INTO known_users (user_id, channel_id, username, first_name, updated_at)
+                VALUES (?, ?, ?, ?, datetime('now'))
+                ON CONFLICT(user_id, channel_id) DO UPDATE SET
+                    username = excluded.username,
+                    first_name = excluded.first_name,
+                    updated_at = excluded.updated_at
+                """,
+                rows,
+            )
+        self._touch_birthdays(*{row[1] for row in rows})
+        self._db.on_commit(lambda: self._remember_known_users(rows))
+
+    def _remember_known_users(
+        self, rows: list[tuple[int, int, str | None, str | None]]
+    ) -> None:
+        for user_id, channel_id, username, first_name in rows:
+            self.known_users_cache.set((user_id, channel_id), (username, first_name))
 
     async def find_user_by_username(
         self, channel_id: int, username: str
-    ) -> dict[str, Any] | None:
-        cursor = await self._db.conn.execute(
-            """
-            SELECT * FROM known_users
+    ) -> KnownUser | None:
+        return await self._fetch_one(
+            KnownUser,
+            f"""
+            SELECT {columns(KnownUser)} FROM known_users
             WHERE channel_id = ? AND username = ? COLLATE NOCASE
             """,
             (channel_id, username),
         )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
 
     async def find_user_by_id(
         self, channel_id: int, user_id: int
-    ) -> dict[str, Any] | None:
-        cursor = await self._db.conn.execute(
-            "SELECT * FROM known_users WHERE channel_id = ? AND user_id = ?",
+    ) -> KnownUser | None:
+        return await self._fetch_one(
+            KnownUser,
+            f"""
+            SELECT {columns(KnownUser)} FROM known_users
+            WHERE channel_id = ? AND user_id = ?
+            """,
             (channel_id, user_id),
         )
-        row = await cursor.fetchone()
-        return dict(row) if row else None
 
+    # ── Greeting templates ────────────────────────────────────────────
+
+    async def add_template(
+        self, channel_id: int, text: str, created_by: int
+    ) -> int:
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                """
+                INSERT INTO greeting_templates (channel_id, text, created_by)
+                VALUES (?, ?, ?)
+                """,
+                (channel_id, text, created_by),
+            )
+        return cursor.lastrowid
+
+    async def get_templates(self, channel_id: int) -> list[GreetingTemplate]:
+        return await self._fetch_all(
+            GreetingTemplate,
+            f"""
+            SELECT {columns(GreetingTemplate)} FROM greeting_templates
+            WHERE channel_id = ?
+            ORDER BY id
+            """,
+            (channel_id,),
+        )
+
+    async def remove_template(self, channel_id: int, template_id: int) -> bool:
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM greeting_templates WHERE id = ? AND channel_id = ?",
+                (template_id, channel_id),
+            )
+        return cursor.rowcount > 0
+
+    async def next_template_slot(
+        self, channel_id: int, size: int, new_seed: int
+    ) -> tuple[int, int]:
+        """Advance the channel's template rotation and return (seed, cursor).
+
+        The cursor moves one step per call. When it has covered all ``size``
+        templates, or the template set changed size, a new round starts at
+        cursor 0 with ``new_seed``.
+        """
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                """
+                INSERT INTO template_rotation (channel_id, seed, cursor, size)
+                VALUES (?, ?, 0, ?)
+                ON CONFLICT(channel_id) DO UPDATE SET
+                    seed = CASE
+                        WHEN cursor + 1 >= excluded.size OR size != excluded.size
+                        THEN excluded.seed ELSE seed END,
+                    cursor = CASE
+                        WHEN cursor + 1 >= excluded.size OR size != excluded.size
+                        THEN 0 ELSE cursor + 1 END,
+                    size = excluded.size
+                RETURNING seed, cursor
+                """,
+                (channel_id, new_seed, size),
+            )
+            row = await cursor.fetchone()
+        return row[0], row[1]
+
+    async def reset_template_rotation(self, channel_id: int) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "DELETE FROM template_rotation WHERE channel_id = ?", (channel_id,)
+            )
+
+    # ── Media cache ───────────────────────────────────────────────────
+
+    async def get_media_file_id(self, sha256: str, kind: str) -> str | None:
+        async with self._db.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT file_id FROM media_cache WHERE sha256 = ? AND kind = ?",
+                (sha256, kind),
+            )
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def set_media_file_id(
+        self, sha256: str, kind: str, file_id: str, size: int
+    ) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO media_cache (sha256, kind, file_id, size)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(sha256, kind) DO UPDATE SET
+                    file_id = excluded.file_id,
+                    size = excluded.size
+                """,
+                (sha256, kind, file_id, size),
+            )
+
+    async def delete_media_file_id(self, sha256: str, kind: str) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "DELETE FROM media_cache WHERE sha256 = ? AND kind = ?",
+                (sha256, kind),
+            )
+
+    # ── Greeting outbox ───────────────────────────────────────────────
+
+    async def enqueue_greetings(
+        self,
+        rows: list[tuple[int, int, int, str | None, str | None, int, int]],
+        not_before: float,
+    ) -> int:
+        """Queue (channel_id, user_id, year, username, first_name, day, month) rows.
+
+        Greetings already queued or recorded in the sent-ledger for that
+        (channel_id, user_id, year) are skipped. Returns the number queued.
+        """
+        async with self._db.transaction() as conn:
+            before = conn.total_changes
+            await conn.executemany(
+                """
+                INSERT INTO greeting_outbox (channel_id, user_id, year, username,
+                                             first_name, birth_day, birth_month,
+                                             next_attempt_at)
+                SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM greetings_sent
+                    WHERE channel_id = ?1 AND user_id = ?2 AND year = ?3
+                )
+                ON CONFLICT(channel_id, user_id, year) DO NOTHING
+                """,
+                [(*row, not_before) for row in rows],
+            )
+            return conn.total_changes - before
+
+    async def claim_outbox(
+        self, limit: int, now: float, lease: float
+    ) -> list[OutboxEntry]:
+        """Claim up to ``limit`` due greetings for ``lease`` seconds.
+
+        Claimed rows are hidden from other claims until the lease runs out,
+        so a greeting whose worker died is picked up again later.
+        """
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                f"""
+                UPDATE greeting_outbox
+                SET claimed_until = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM greeting_outbox
+                    WHERE next_attempt_at <= ? AND claimed_until <= ?
+                    ORDER BY next_attempt_at
+                    LIMIT ?
+                )
+                RETURNING {columns(OutboxEntry)}
+                """,
+                (now + lease, now, now, limit),
+            )
+            cursor.row_factory = row_factory(OutboxEntry)
+            return await cursor.fetchall()
+
+    async def claim_channel_outbox(
+        self, channel_id: int, now: float, lease: float
+    ) -> list[OutboxEntry]:
+        """Claim every due greeting of one channel for ``lease`` seconds."""
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                f"""
+                UPDATE greeting_outbox
+                SET claimed_until = ?, attempts = attempts + 1
+                WHERE id IN (
+                    SELECT id FROM greeting_outbox
+                    WHERE channel_id = ? AND next_attempt_at <= ?
+                        AND claimed_until <= ?
+                )
+                RETURNING {columns(OutboxEntry)}
+                """,
+                (now + lease, channel_id, now, now),
+            )
+            cursor.row_factory = row_factory(OutboxEntry)
+            return await cursor.fetchall()
+
+    async def release_outbox_claims(self) -> None:
+        """Make every claimed greeting available again, e.g. after a restart."""
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "UPDATE greeting_outbox SET claimed_until = 0 WHERE claimed_until > 0"
+            )
+
+    async def complete_greeting(self, entry: OutboxEntry) -> None:
+        """Record ``entry`` in the sent-ledger and drop it from the outbox."""
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO greetings_sent (channel_id, user_id, year)
+                VALUES (?, ?, ?)
+                ON CONFLICT(channel_id, user_id, year) DO NOTHING
+                """,
+                (entry.channel_id, entry.user_id, entry.year),
+            )
+            await conn.execute(
+                "DELETE FROM greeting_outbox WHERE id = ?", (entry.id,)
+            )
+
+    async def retry_greeting(
+        self, outbox_id: int, next_attempt_at: float, error: str
+    ) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                UPDATE greeting_outbox
+                SET next_attempt_at = ?, claimed_until = 0, last_error = ?
+                WHERE id = ?
+                """,
+                (next_attempt_at, error, outbox_id),
+            )
+
+    async def drop_greeting(self, outbox_id: int) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                "DELETE FROM greeting_outbox WHERE id = ?", (outbox_id,)
+            )
+
+    async def prune_sent_greetings(self, before_year: int) -> int:
+        """Forget ledger entries older than ``before_year``."""
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM greetings_sent WHERE year < ?", (before_year,)
+            )
+        return cursor.rowcount
+
+    # ── Bot state ─────────────────────────────────────────────────────
+
+    async def get_state(self, key: str) -> str | None:
+        async with self._db.reader() as conn:
+            cursor = await conn.execute(
+                "SELECT value FROM bot_state WHERE key = ?", (key,)
+            )
+            row = await cursor.fetchone()
+        return row[0] if row else None
+
+    async def set_state(self, key: str, value: str) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO bot_state (key, value) VALUES (?, ?)
+                ON CONFLICT(key) DO UPDATE SET value = excluded.value
+                """,
+                (key, value),
+            )
+
+    # ── FSM storage ───────────────────────────────────────────────────
+
+    async def get_fsm_record(
+        self, key: str, updated_after: float
+    ) -> tuple[str | None, str, float] | None:
+        """(state, data JSON, updated_at) for ``key``, unless older than ``updated_after``."""
+        async with self._db.reader() as conn:
+            cursor = await conn.execute(
+                """
+                SELECT state, data, updated_at FROM fsm_storage
+                WHERE key = ? AND updated_at > ?
+                """,
+                (key, updated_after),
+            )
+            row = await cursor.fetchone()
+        return (row[0], row[1], row[2]) if row else None
+
+    async def set_fsm_record(
+        self, key: str, state: str | None, data: str, updated_at: float
+    ) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute(
+                """
+                INSERT INTO fsm_storage (key, state, data, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    state = excluded.state,
+                    data = excluded.data,
+                    updated_at = excluded.updated_at
+                """,
+                (key, state, data, updated_at),
+            )
+
+    async def delete_fsm_record(self, key: str) -> None:
+        async with self._db.transaction() as conn:
+            await conn.execute("DELETE FROM fsm_storage WHERE key = ?", (key,))
+
+    async def prune_fsm_records(self, updated_before: float) -> int:
+        """Delete FSM records last written before ``updated_before``."""
+        async with self._db.transaction() as conn:
+            cursor = await conn.execute(
+                "DELETE FROM fsm_storage WHERE updated_at <= ?", (updated_before,)
+            )
+        return cursor.rowcount
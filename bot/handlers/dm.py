@@ -7,19 +7,31 @@ from aiogram.enums import ChatType
 from aiogram.filters import Command, CommandObject
 from aiogram.fsm.context import FSMContext
 from aiogram.types import CallbackQuery, Message
+from aiogram.utils.text_decorations import html_decoration
 
+from bot.catalogs import available_locales
 from bot.db.repositories import Repository
 from bot.keyboards.inline import (
     AdminActionCB,
+    BirthdayPageCB,
+    ChannelPageCB,
     ChannelSelectCB,
+    LocaleCB,
     build_admin_menu_kb,
+    build_birthday_page_kb,
     build_channel_select_kb,
+    build_locale_kb,
 )
 from bot.services.admin import AdminService
-from bot.services.birthday import BirthdayService
+from bot.services.birthday import UPCOMING_DEFAULT_DAYS, BirthdayService
+from bot.services.greeting import MESSAGE_LIMIT, GreetingService
 from bot.services.scheduler import SchedulerService
 from bot.states.admin_fsm import AdminFSM
-from bot.utils.date_helpers import format_birthday, format_birthday_list, parse_birthday
+from bot.utils.date_helpers import (
+    format_birthday,
+    format_upcoming_list,
+    parse_birthday,
+)
 from bot.utils.user_resolver import resolve_user
 
 router = Router(name="dm_admin")
@@ -34,27 +46,75 @@ router.callback_query.filter(F.message.chat.type == ChatType.PRIVATE)
 async def cmd_admin(
     message: Message, state: FSMContext, admin_service: AdminService
 ) -> None:
-    channels = await admin_service.get_admin_channels(message.from_user.id)
-    if not channels:
+    page = await admin_service.get_channel_page(message.from_user.id)
+    if not page.channels and page.next_cursor is None:
         await message.answer("You are not an admin of any channel.")
         return
 
-    if len(channels) == 1:
-        ch = channels[0]
-        await state.update_data(channel_id=ch["id"], channel_title=ch["title"])
+    if len(page.channels) == 1 and page.next_cursor is None:
+        ch = page.channels[0]
+        await state.update_data(channel_id=ch.id, channel_title=ch.title)
         await state.set_state(AdminFSM.main_menu)
         await message.answer(
-            f"Managing: <b>{ch['title'] or ch['id']}</b>",
+            f"Managing: <b>{ch.title or ch.id}</b>",
             reply_markup=build_admin_menu_kb(),
         )
     else:
         await state.set_state(AdminFSM.select_channel)
         await message.answer(
             "Select a channel to manage:",
-            reply_markup=build_channel_select_kb(channels),
+            reply_markup=build_channel_select_kb(*page),
         )
 
 
+@router.callback_query(ChannelPageCB.filter(), AdminFSM.select_channel)
+async def on_channel_page(
+    callback: CallbackQuery,
+    callback_data: ChannelPageCB,
+    admin_service: AdminService,
+) -> None:
+    page = await admin_service.get_channel_page(
+        callback.from_user.id, callback_data.after, callback_data.before
+    )
+    await callback.message.edit_text(
+        "Select a channel to manage:",
+        reply_markup=build_channel_select_kb(*page),
+    )
+    await callback.answer()
+
+
+@router.callback_query(
+    AdminActionCB.filter(F.action == "search_ch"), AdminFSM.select_channel
+)
+async def on_search_channel(callback: CallbackQuery, state: FSMContext) -> None:
+    await state.set_state(AdminFSM.search_channel)
+    await callback.message.edit_text(
+        "Send the beginning of the channel title:"
+    )
+    await callback.answer()
+
+
+@router.message(AdminFSM.search_channel, F.text, ~F.text.startswith("/"))
+async def on_search_channel_query(
+    message: Message, state: FSMContext, admin_service: AdminService
+) -> None:
+    channels, more = await admin_service.search_channels(
+        message.from_user.id, message.text.strip()
+    )
+    if not channels:
+        await message.answer(
+            "No channels found. Send another title or /cancel."
+        )
+        return
+    text = "Matching channels:"
+    if more:
+        text += "\n<i>Showing the first matches; search again to narrow down.</i>"
+    await state.set_state(AdminFSM.select_channel)
+    await message.answer(
+        text, reply_markup=build_channel_select_kb(channels, show_all=True)
+    )
+
+
 @router.callback_query(ChannelSelectCB.filter(), AdminFSM.select_channel)
 async def on_channel_selected(
     callback: CallbackQuery,
@@ -63,7 +123,7 @@ async def on_channel_selected(
     repo: Repository,
 ) -> None:
     channel = await repo.get_channel(callback_data.channel_id)
-    title = channel["title"] if channel else str(callback_data.channel_id)
+    title = channel.title if channel else str(callback_data.channel_id)
     await state.update_data(
         channel_id=callback_data.channel_id, channel_title=title
     )
@@ -82,14 +142,14 @@ async def on_channel_selected(
 async def on_switch_channel(
     callback: CallbackQuery, state: FSMContext, admin_service: AdminService
 ) -> None:
-    channels = await admin_service.get_admin_channels(callback.from_user.id)
-    if len(channels) <= 1:
+    page = await admin_service.get_channel_page(callback.from_user.id)
+    if len(page.channels) <= 1 and page.next_cursor is None:
         await callback.answer("You only have one channel.", show_alert=True)
         return
     await state.set_state(AdminFSM.select_channel)
     await callback.message.edit_text(
         "Select a channel to manage:",
-        reply_markup=build_channel_select_kb(channels),
+        reply_markup=build_channel_select_kb(*page),
     )
     await callback.answer()
 
@@ -124,14 +184,62 @@ async def on_list_birthdays(
     birthday_service: BirthdayService,
 ) -> None:
     data = await state.get_data()
-    channel_id = data["channel_id"]
-    birthdays = await birthday_service.list_birthdays(channel_id)
+    page = await birthday_service.birthday_page(data["channel_id"], show_id=True)
 
-    if not birthdays:
+    if not page.text:
         text = "No birthdays registered in this channel yet."
     else:
-        lines = ["🎂 <b>Birthdays:</b>\n"]
-        lines.extend(format_birthday_list(birthdays, show_id=True))
+        text = f"🎂 <b>Birthdays:</b>\n\n{page.text}"
+
+    await callback.message.edit_text(
+        text,
+        reply_markup=build_birthday_page_kb(
+            page.prev_cursor, page.next_cursor, with_menu=True
+        ),
+    )
+    await callback.answer()
+
+
+@router.callback_query(BirthdayPageCB.filter(), AdminFSM.main_menu)
+async def on_birthdays_page(
+    callback: CallbackQuery,
+    callback_data: BirthdayPageCB,
+    state: FSMContext,
+    birthday_service: BirthdayService,
+) -> None:
+    data = await state.get_data()
+    cursor = (callback_data.month, callback_data.day, callback_data.id)
+    page = await birthday_service.birthday_page(
+        data["channel_id"],
+        before=cursor if callback_data.back else None,
+        after=None if callback_data.back else cursor,
+        show_id=True,
+    )
+    await callback.message.edit_text(
+        f"🎂 <b>Birthdays:</b>\n\n{page.text or 'No more birthdays.'}",
+        reply_markup=build_birthday_page_kb(
+            page.prev_cursor, page.next_cursor, with_menu=True
+        ),
+    )
+    await callback.answer()
+
+
+@router.callback_query(AdminActionCB.filter(F.action == "upcoming"), AdminFSM.main_menu)
+async def on_upcoming(
+    callback: CallbackQuery,
+    state: FSMContext,
+    birthday_service: BirthdayService,
+) -> None:
+    data = await state.get_data()
+    entries, more = await birthday_service.upcoming_birthdays(data["channel_id"])
+
+    if not entries:
+        text = f"No birthdays in the next {UPCOMING_DEFAULT_DAYS} days."
+    else:
+        lines = [f"📅 <b>Birthdays in the next {UPCOMING_DEFAULT_DAYS} days:</b>\n"]
+        lines.extend(format_upcoming_list(entries))
+        if more:
+            lines.append("  …and more")
         text = "\n".join(lines)
 
     await callback.message.edit_text(text, reply_markup=build_admin_menu_kb())
@@ -148,14 +256,69 @@ async def on_settings(
         await callback.answer("Channel not found.", show_alert=True)
         return
     text = (
-        f"⚙️ <b>Settings for {data.get('channel_title', channel['id'])}</b>\n\n"
-        f"🕐 Greeting time: <b>{channel['greeting_time']}</b>\n"
-        f"🌍 Timezone: <b>{channel['timezone']}</b>"
+        f"⚙️ <b>Settings for {data.get('channel_title', channel.id)}</b>\n\n"
+        f"🕐 Greeting time: <b>{channel.greeting_time}</b>\n"
+        f"🌍 Timezone: <b>{channel.timezone}</b>\n"
+        f"🎉 Greetings: <b>{_greeting_mode(channel.combine_greetings)}</b>\n"
+        f"🗣 Language: <b>{channel.locale}</b>"
     )
     await callback.message.edit_text(text, reply_markup=build_admin_menu_kb())
     await callback.answer()
 
 
+@router.callback_query(AdminActionCB.filter(F.action == "combine"), AdminFSM.main_menu)
+async def on_toggle_combine(
+    callback: CallbackQuery, state: FSMContext, repo: Repository
+) -> None:
+    data = await state.get_data()
+    channel = await repo.get_channel(data["channel_id"])
+    if not channel:
+        await callback.answer("Channel not found.", show_alert=True)
+        return
+    combine = not channel.combine_greetings
+    await repo.update_channel_combine_greetings(channel.id, combine)
+    await callback.message.edit_text(
+        f"✅ Greetings: {_greeting_mode(combine)}.",
+        reply_markup=build_admin_menu_kb(),
+    )
+    await callback.answer()
+
+
+@router.callback_query(AdminActionCB.filter(F.action == "locale"), AdminFSM.main_menu)
+async def on_locale(callback: CallbackQuery) -> None:
+    await callback.message.edit_text(
+        "Choose the language of the built-in greetings:",
+        reply_markup=build_locale_kb(available_locales()),
+    )
+    await callback.answer()
+
+
+@router.callback_query(LocaleCB.filter(), AdminFSM.main_menu)
+async def on_locale_selected(
+    callback: CallbackQuery,
+    callback_data: LocaleCB,
+    state: FSMContext,
+    greeting_service: GreetingService,
+) -> None:
+    data = await state.get_data()
+    try:
+        await greeting_service.set_locale(data["channel_id"], callback_data.locale)
+    except ValueError as e:
+        await callback.answer(str(e), show_alert=True)
+        return
+    await callback.message.edit_text(
+        f"✅ Language set to {callback_data.locale}.",
+        reply_markup=build_admin_menu_kb(),
+    )
+    await callback.answer()
+
+
+def _greeting_mode(combine: bool | int) -> str:
+    if combine:
+        return "one message for all birthdays of the day"
+    return "one message per person"
+
+
 @router.callback_query(AdminActionCB.filter(F.action == "set_time"), AdminFSM.main_menu)
 async def on_set_time(callback: CallbackQuery, state: FSMContext) -> None:
     await state.set_state(AdminFSM.set_time)
@@ -174,6 +337,38 @@ async def on_set_timezone(callback: CallbackQuery, state: FSMContext) -> None:
     await callback.answer()
 
 
+@router.callback_query(AdminActionCB.filter(F.action == "templates"), AdminFSM.main_menu)
+async def on_templates(
+    callback: CallbackQuery, state: FSMContext, greeting_service: GreetingService
+) -> None:
+    data = await state.get_data()
+    templates = await greeting_service.list_templates(data["channel_id"])
+    instructions = (
+        "\nSend a new template to add it, or <b>-ID</b> to delete one.\n"
+        "Placeholders: {name}, {username}, {day}, {month}.\n"
+        "Use /cancel when done."
+    )
+    if templates:
+        entries = [f"[{t.id}] {html_decoration.quote(t.text)}" for t in templates]
+        # Drop whole entries from the end until the message fits, listing
+        # the IDs of the omitted ones so they can still be deleted
+        shown = len(entries)
+        while True:
+            lines = ["📝 <b>Custom templates:</b>\n", *entries[:shown]]
+            if shown < len(entries):
+                rest = ", ".join(str(t.id) for t in templates[shown:])
+                lines.append(f"…and {len(entries) - shown} more: {rest}")
+            lines.append(instructions)
+            if shown == 0 or len("\n".join(lines)) <= MESSAGE_LIMIT:
+                break
+            shown -= 1
+    else:
+        lines = ["📝 This channel uses the built-in templates.", instructions]
+    await state.set_state(AdminFSM.edit_templates)
+    await callback.message.edit_text("\n".join(lines))
+    await callback.answer()
+
+
 # ── Add birthday flow ─────────────────────────────────────────────────
 
 
@@ -357,8 +552,8 @@ async def on_edit_user_select(
         await state.set_state(AdminFSM.main_menu)
         return
 
-    current_name = bd["first_name"] or "not set"
-    current_username = f"@{bd['username']}" if bd["username"] else "not set"
+    current_name = bd.first_name or "not set"
+    current_username = f"@{bd.username}" if bd.username else "not set"
     await state.update_data(edit_user_id=user_id)
     await state.set_state(AdminFSM.edit_user_name)
     await message.answer(
@@ -447,7 +642,7 @@ async def on_set_time_input(
     # Update the scheduler job
     channel = await repo.get_channel(channel_id)
     scheduler_service.update_channel_job(
-        channel_id, greeting_time, channel["timezone"]
+        channel_id, greeting_time, channel.timezone
     )
 
     await state.set_state(AdminFSM.main_menu)
@@ -487,7 +682,7 @@ async def on_set_timezone_input(
 
     channel = await repo.get_channel(channel_id)
     scheduler_service.update_channel_job(
-        channel_id, channel["greeting_time"], text
+        channel_id, channel.greeting_time, text
     )
 
     await state.set_state(AdminFSM.main_menu)
@@ -497,6 +692,39 @@ async def on_set_timezone_input(
     )
 
 
+# ── Templates flow ────────────────────────────────────────────────────
+
+
+@router.message(AdminFSM.edit_templates, ~F.text.startswith("/"))
+async def on_template_input(
+    message: Message, state: FSMContext, greeting_service: GreetingService
+) -> None:
+    text = message.text or ""
+    data = await state.get_data()
+    channel_id = data["channel_id"]
+
+    match = re.fullmatch(r"\s*-(\d+)\s*", text)
+    if match:
+        template_id = int(match.group(1))
+        if await greeting_service.remove_template(channel_id, template_id):
+            reply = f"✅ Template {template_id} deleted."
+        else:
+            reply = f"Template {template_id} not found."
+    else:
+        try:
+            template_id = await greeting_service.add_template(
+                channel_id, text, message.from_user.id
+            )
+        except ValueError as e:
+            # The message can quote the user's placeholders
+            await message.answer(f"❌ {html_decoration.quote(str(e))}")
+            return
+        reply = f"✅ Template {template_id} added."
+
+    await state.set_state(AdminFSM.main_menu)
+    await message.answer(reply, reply_markup=build_admin_menu_kb())
+
+
 # ── /cancel — exit any FSM state ──────────────────────────────────────
 
 
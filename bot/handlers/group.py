@@ -1,16 +1,25 @@
 from aiogram import F, Router
 from aiogram.enums import ChatType
 from aiogram.filters import Command, CommandObject
-from aiogram.types import Message
+from aiogram.types import CallbackQuery, Message
 
 from bot.config import settings
 from bot.db.repositories import Repository
+from bot.keyboards.inline import BirthdayPageCB, build_birthday_page_kb
 from bot.middlewares.auth import UserTrackingMiddleware
-from bot.services.birthday import BirthdayService
-from bot.utils.date_helpers import format_birthday, format_birthday_list, parse_birthday
+from bot.services.birthday import UPCOMING_DEFAULT_DAYS, BirthdayService
+from bot.utils.date_helpers import (
+    format_birthday,
+    format_upcoming_list,
+    parse_birthday,
+    parse_days,
+)
 
 router = Router(name="group")
 router.message.filter(F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}))
+router.callback_query.filter(
+    F.message.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP})
+)
 router.message.outer_middleware(UserTrackingMiddleware())
 
 
@@ -29,6 +38,7 @@ async def cmd_start(message: Message, repo: Repository) -> None:
         "/setbirthday DD.MM — set your birthday\n"
         "/mybirthday — show your birthday\n"
         "/birthdays — list all birthdays\n"
+        "/upcoming [days] — birthdays in the next days (default 30)\n"
         "/removebirthday — remove your birthday"
     )
 
@@ -50,25 +60,26 @@ async def cmd_set_birthday(
         await message.answer(f"❌ {e}")
         return
 
-    # Ensure channel is registered
-    channel = await repo.get_channel(message.chat.id)
-    if not channel:
-        await repo.upsert_channel(
-            message.chat.id,
-            message.chat.title,
-            settings.default_timezone,
-            settings.default_greeting_time,
+    async with repo.transaction():
+        # Ensure channel is registered
+        channel = await repo.get_channel(message.chat.id)
+        if not channel:
+            await repo.upsert_channel(
+                message.chat.id,
+                message.chat.title,
+                settings.default_timezone,
+                settings.default_greeting_time,
+            )
+
+        await birthday_service.set_birthday(
+            channel_id=message.chat.id,
+            user_id=message.from_user.id,
+            username=message.from_user.username,
+            first_name=message.from_user.first_name,
+            day=day,
+            month=month,
+            set_by=message.from_user.id,
         )
-
-    await birthday_service.set_birthday(
-        channel_id=message.chat.id,
-        user_id=message.from_user.id,
-        username=message.from_user.username,
-        first_name=message.from_user.first_name,
-        day=day,
-        month=month,
-        set_by=message.from_user.id,
-    )
     await message.answer(f"✅ Your birthday is set to {format_birthday(day, month)}!")
 
 
@@ -79,7 +90,7 @@ async def cmd_my_birthday(
     bd = await birthday_service.get_birthday(message.chat.id, message.from_user.id)
     if bd:
         await message.answer(
-            f"🎂 Your birthday: {format_birthday(bd['birth_day'], bd['birth_month'])}"
+            f"🎂 Your birthday: {format_birthday(bd.birth_day, bd.birth_month)}"
         )
     else:
         await message.answer(
@@ -91,14 +102,57 @@ async def cmd_my_birthday(
 async def cmd_birthdays(
     message: Message, birthday_service: BirthdayService
 ) -> None:
-    birthdays = await birthday_service.list_birthdays(message.chat.id)
-    if not birthdays:
+    page = await birthday_service.birthday_page(message.chat.id)
+    if not page.text:
         await message.answer("No birthdays registered yet. Be the first! /setbirthday DD.MM")
         return
 
-    lines = ["🎂 <b>Birthdays in this chat:</b>\n"]
-    lines.extend(format_birthday_list(birthdays))
+    await message.answer(
+        f"🎂 <b>Birthdays in this chat:</b>\n\n{page.text}",
+        reply_markup=build_birthday_page_kb(page.prev_cursor, page.next_cursor),
+    )
+
+
+@router.callback_query(BirthdayPageCB.filter())
+async def on_birthdays_page(
+    callback: CallbackQuery,
+    callback_data: BirthdayPageCB,
+    birthday_service: BirthdayService,
+) -> None:
+    cursor = (callback_data.month, callback_data.day, callback_data.id)
+    page = await birthday_service.birthday_page(
+        callback.message.chat.id,
+        before=cursor if callback_data.back else None,
+        after=None if callback_data.back else cursor,
+    )
+    await callback.message.edit_text(
+        f"🎂 <b>Birthdays in this chat:</b>\n\n{page.text or 'No more birthdays.'}",
+        reply_markup=build_birthday_page_kb(page.prev_cursor, page.next_cursor),
+    )
+    await callback.answer()
+
+
+@router.message(Command("upcoming"))
+async def cmd_upcoming(
+    message: Message, command: CommandObject, birthday_service: BirthdayService
+) -> None:
+    days = UPCOMING_DEFAULT_DAYS
+    if command.args:
+        try:
+            days = parse_days(command.args)
+        except ValueError as e:
+            await message.answer(f"❌ {e}")
+            return
+
+    entries, more = await birthday_service.upcoming_birthdays(message.chat.id, days)
+    if not entries:
+        await message.answer(f"No birthdays in the next {days} days.")
+        return
 
+    lines = [f"📅 <b>Birthdays in the next {days} days:</b>\n"]
+    lines.extend(format_upcoming_list(entries))
+    if more:
+        lines.append("  …and more")
     await message.answer("\n".join(lines))
 
 
@@ -0,0 +1,40 @@
+from aiogram import F, Router
+from aiogram.enums import ChatType
+from aiogram.filters import JOIN_TRANSITION, LEAVE_TRANSITION, ChatMemberUpdatedFilter
+from aiogram.types import ChatMemberUpdated, Message
+
+from bot.config import settings
+from bot.services.admin import AdminService
+
+router = Router(name="membership")
+router.my_chat_member.filter(F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}))
+router.message.filter(F.chat.type.in_({ChatType.GROUP, ChatType.SUPERGROUP}))
+
+
+@router.my_chat_member(ChatMemberUpdatedFilter(JOIN_TRANSITION))
+async def on_bot_added(event: ChatMemberUpdated, admin_service: AdminService) -> None:
+    await admin_service.register_channel(
+        event.chat.id,
+        event.chat.title,
+        settings.default_timezone,
+        settings.default_greeting_time,
+    )
+
+
+@router.my_chat_member(ChatMemberUpdatedFilter(LEAVE_TRANSITION))
+async def on_bot_removed(
+    event: ChatMemberUpdated, admin_service: AdminService
+) -> None:
+    await admin_service.deactivate_channel(event.chat.id)
+
+
+@router.message(F.migrate_to_chat_id)
+async def on_migrated_to(message: Message, admin_service: AdminService) -> None:
+    # Sent in the old group when it becomes a supergroup
+    await admin_service.migrate_channel(message.chat.id, message.migrate_to_chat_id)
+
+
+@router.message(F.migrate_from_chat_id)
+async def on_migrated_from(message: Message, admin_service: AdminService) -> None:
+    # Sent in the new supergroup; whichever arrives first does the move
+    await admin_service.migrate_channel(message.migrate_from_chat_id, message.chat.id)
@@ -2,23 +2,65 @@ from aiogram.filters.callback_data import CallbackData
 from aiogram.types import InlineKeyboardMarkup
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
+from bot.db.models import Channel
+
 
 class ChannelSelectCB(CallbackData, prefix="ch_sel"):
     channel_id: int
 
 
+class ChannelPageCB(CallbackData, prefix="ch_pg"):
+    after: int | None = None
+    before: int | None = None
+
+
+class BirthdayPageCB(CallbackData, prefix="bd_pg"):
+    month: int
+    day: int
+    id: int
+    back: bool = False  # True: the page before the cursor
+
+
 class AdminActionCB(CallbackData, prefix="adm_act"):
     action: str
 
 
-def build_channel_select_kb(channels: list[dict]) -> InlineKeyboardMarkup:
+class LocaleCB(CallbackData, prefix="locale"):
+    locale: str
+
+
+def build_channel_select_kb(
+    channels: list[Channel],
+    prev_cursor: int | None = None,
+    next_cursor: int | None = None,
+    show_all: bool = False,
+) -> InlineKeyboardMarkup:
+    """One page of the channel picker, with paging and search buttons."""
     builder = InlineKeyboardBuilder()
     for ch in channels:
         builder.button(
-            text=ch["title"] or f"Chat {ch['id']}",
-            callback_data=ChannelSelectCB(channel_id=ch["id"]),
+            text=ch.title or f"Chat {ch.id}",
+            callback_data=ChannelSelectCB(channel_id=ch.id),
         )
-    builder.adjust(1)
+    sizes = [1] * len(channels)
+
+    nav = 0
+    if prev_cursor is not None:
+        builder.button(text="◀️ Prev", callback_data=ChannelPageCB(before=prev_cursor))
+        nav += 1
+    if next_cursor is not None:
+        builder.button(text="Next ▶️", callback_data=ChannelPageCB(after=next_cursor))
+        nav += 1
+    if nav:
+        sizes.append(nav)
+
+    builder.button(text="🔍 Search", callback_data=AdminActionCB(action="search_ch"))
+    if show_all:
+        builder.button(text="📋 All channels", callback_data=ChannelPageCB())
+        sizes.append(2)
+    else:
+        sizes.append(1)
+    builder.adjust(*sizes)
     return builder.as_markup()
 
 
@@ -28,9 +70,13 @@ def build_admin_menu_kb() -> InlineKeyboardMarkup:
         ("➕ Add birthday", "add_bd"),
         ("➖ Remove birthday", "rm_bd"),
         ("📋 List birthdays", "list_bd"),
+        ("📅 Upcoming", "upcoming"),
         ("✏️ Edit user", "edit_user"),
         ("🕐 Set greeting time", "set_time"),
         ("🌍 Set timezone", "set_tz"),
+        ("🎉 Combined greetings", "combine"),
+        ("📝 Templates", "templates"),
+        ("🗣 Language", "locale"),
         ("⚙️ Settings", "settings"),
         ("🔄 Switch channel", "switch_ch"),
     ]
@@ -38,3 +84,38 @@ def build_admin_menu_kb() -> InlineKeyboardMarkup:
         builder.button(text=text, callback_data=AdminActionCB(action=action))
     builder.adjust(2)
     return builder.as_markup()
+
+
+def build_locale_kb(locales: tuple[str, ...]) -> InlineKeyboardMarkup:
+    builder = InlineKeyboardBuilder()
+    for locale in locales:
+        builder.button(text=locale, callback_data=LocaleCB(locale=locale))
+    builder.adjust(4)
+    return builder.as_markup()
+
+
+def build_birthday_page_kb(
+    prev_cursor: tuple[int, int, int] | None,
+    next_cursor: tuple[int, int, int] | None,
+    with_menu: bool = False,
+) -> InlineKeyboardMarkup | None:
+    """Prev/next buttons for a birthday list page, optionally above the admin menu."""
+    if prev_cursor is None and next_cursor is None and not with_menu:
+        return None
+    builder = InlineKeyboardBuilder()
+    if prev_cursor is not None:
+        month, day, bd_id = prev_cursor
+        builder.button(
+            text="◀️ Prev",
+            callback_data=BirthdayPageCB(month=month, day=day, id=bd_id, back=True),
+        )
+    if next_cursor is not None:
+        month, day, bd_id = next_cursor
+        builder.button(
+            text="Next ▶️",
+            callback_data=BirthdayPageCB(month=month, day=day, id=bd_id),
+        )
+    builder.adjust(2)
+    if with_menu:
+        builder.attach(InlineKeyboardBuilder.from_markup(build_admin_menu_kb()))
+    return builder.as_markup()
@@ -29,7 +29,11 @@ class OwnerAuthMiddleware(BaseMiddleware):
 
 
 class UserTrackingMiddleware(BaseMiddleware):
-    """Silently caches user info from group messages into known_users table."""
+    """Silently caches user info from group messages into known_users table.
+
+    Writes go through the ``UserTracker`` write-behind buffer, so the handler
+    never waits on a database commit.
+    """
 
     async def __call__(
         self,
@@ -43,10 +47,10 @@ class UserTrackingMiddleware(BaseMiddleware):
         ):
             user = event.from_user
             if user and not user.is_bot:
-                repo = data.get("repo")
-                if repo:
+                tracker = data.get("user_tracker")
+                if tracker:
                     try:
-                        await repo.upsert_known_user(
+                        await tracker.track(
                             user_id=user.id,
                             channel_id=event.chat.id,
                             username=user.username,
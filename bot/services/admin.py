@@ -1,20 +1,70 @@
 from __future__ import annotations
 
+import asyncio
 import logging
-from typing import Any
+from typing import Any, Coroutine, NamedTuple
 
 from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramAPIError,
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramMigrateToChat,
+)
 
+from bot.db.models import Channel
 from bot.db.repositories import Repository
+from bot.services.scheduler import SchedulerService
+from bot.utils.cache import LRUCache
 
 logger = logging.getLogger(__name__)
 
+# Channels per page of the channel picker
+CHANNEL_PAGE_SIZE = 8
+
+
+class ChannelPage(NamedTuple):
+    channels: list[Channel]
+    prev_cursor: int | None  # ``before`` for the previous page, if any
+    next_cursor: int | None  # ``after`` for the next page, if any
+
 
 class AdminService:
-    def __init__(self, repo: Repository, owner_id: int, bot: Bot) -> None:
+    """Admin permissions and the channels an admin can manage.
+
+    Channels are listed a page at a time (keyset pagination by chat ID) or
+    by title prefix, so the picker costs the same however many channels
+    there are. Whether the bot is still in a listed channel is checked
+    with ``getChat``, concurrently for at most ``membership_concurrency``
+    channels at a time. Confirmed memberships are cached for
+    ``membership_ttl`` seconds, so reopening the menu makes no API calls.
+    Membership changes normally arrive as ``my_chat_member`` and migration
+    updates (``register_channel``, ``deactivate_channel``,
+    ``migrate_channel``); the check only catches the ones that were missed.
+    Channels it finds the bot removed from are hidden at once and
+    deactivated in the background.
+    """
+
+    def __init__(
+        self,
+        repo: Repository,
+        owner_id: int,
+        bot: Bot,
+        scheduler: SchedulerService | None = None,
+        membership_ttl: float = 600,
+        membership_concurrency: int = 10,
+        membership_cache_size: int = 10_000,
+    ) -> None:
         self._repo = repo
         self._owner_id = owner_id
         self._bot = bot
+        self._scheduler = scheduler
+        self._check_slots = asyncio.Semaphore(membership_concurrency)
+        # channel_id -> True while the bot is known to be a member
+        self.membership_cache: LRUCache[int, bool] = LRUCache(
+            membership_cache_size, ttl=membership_ttl
+        )
+        self._pending: dict[int, asyncio.Task] = {}
 
     def is_owner(self, user_id: int) -> bool:
         return user_id == self._owner_id
@@ -32,19 +82,127 @@ class AdminService:
     async def revoke_admin(self, channel_id: int, user_id: int) -> bool:
         return await self._repo.remove_admin(channel_id, user_id)
 
-    async def get_admin_channels(self, user_id: int) -> list[dict[str, Any]]:
-        if self.is_owner(user_id):
-            channels = await self._repo.get_all_channels()
+    async def register_channel(
+        self, chat_id: int, title: str | None, timezone: str, greeting_time: str
+    ) -> None:
+        """Register (or reactivate) a chat the bot was added to and schedule it."""
+        await self._repo.upsert_channel(chat_id, title, timezone, greeting_time)
+        channel = await self._repo.get_channel(chat_id)
+        self.membership_cache.set(chat_id, True)
+        if self._scheduler is not None and channel is not None:
+            self._scheduler.update_channel_job(
+                chat_id, channel.greeting_time, channel.timezone
+            )
+
+    async def deactivate_channel(self, chat_id: int) -> None:
+        """Stop greeting a chat the bot was removed from; its data is kept."""
+        self.membership_cache.pop(chat_id)
+        if self._scheduler is not None:
+            self._scheduler.remove_channel_job(chat_id)
+        if await self._repo.deactivate_channel(chat_id):
+            logger.info("Deactivated channel %d", chat_id)
+
+    async def migrate_channel(self, old_id: int, new_id: int) -> None:
+        """Move a group's data to the supergroup it was upgraded to."""
+        if not await self._repo.migrate_channel(old_id, new_id):
+            return
+        logger.info("Channel %d migrated to %d", old_id, new_id)
+        self.membership_cache.pop(old_id)
+        self.membership_cache.set(new_id, True)
+        if self._scheduler is not None:
+            self._scheduler.remove_channel_job(old_id)
+            channel = await self._repo.get_channel(new_id)
+            if channel is not None:
+                self._scheduler.update_channel_job(
+                    new_id, channel.greeting_time, channel.timezone
+                )
+
+    async def get_channel_page(
+        self, user_id: int, after: int | None = None, before: int | None = None
+    ) -> ChannelPage:
+        """A page of the channels ``user_id`` can manage, in ID order.
+
+        Pass ``next_cursor`` as ``after`` or ``prev_cursor`` as ``before``
+        to move between pages.
+        """
+        admin_id = None if self.is_owner(user_id) else user_id
+        rows = await self._repo.get_channels_page(
+            admin_id, after, before, CHANNEL_PAGE_SIZE + 1
+        )
+        if before is not None:
+            has_prev, has_next = len(rows) > CHANNEL_PAGE_SIZE, True
+            rows = rows[-CHANNEL_PAGE_SIZE:]
         else:
-            channels = await self._repo.get_admin_channels(user_id)
+            has_prev, has_next = after is not None, len(rows) > CHANNEL_PAGE_SIZE
+            rows = rows[:CHANNEL_PAGE_SIZE]
+        return ChannelPage(
+            await self._active(rows),
+            rows[0].id if has_prev and rows else None,
+            rows[-1].id if has_next and rows else None,
+        )
+
+    async def search_channels(
+        self, user_id: int, prefix: str
+    ) -> tuple[list[Channel], bool]:
+        """Channels ``user_id`` can manage whose title starts with ``prefix``.
 
+        Returns at most one page of matches and whether there were more.
+        """
+        admin_id = None if self.is_owner(user_id) else user_id
+        rows = await self._repo.search_channels(
+            prefix, admin_id, CHANNEL_PAGE_SIZE + 1
+        )
+        return (
+            await self._active(rows[:CHANNEL_PAGE_SIZE]),
+            len(rows) > CHANNEL_PAGE_SIZE,
+        )
+
+    async def _active(self, channels: list[Channel]) -> list[Channel]:
         # Filter out channels where the bot is no longer a member
-        active = []
-        for ch in channels:
+        member = await asyncio.gather(*(self._is_member(ch.id) for ch in channels))
+        return [ch for ch, ok in zip(channels, member) if ok]
+
+    async def stop(self) -> None:
+        """Wait for background membership updates still in progress."""
+        if self._pending:
+            await asyncio.gather(*self._pending.values())
+
+    async def _is_member(self, channel_id: int) -> bool:
+        if channel_id in self._pending:
+            return False
+        if self.membership_cache.get(channel_id):
+            return True
+        async with self._check_slots:
             try:
-                await self._bot.get_chat(ch["id"])
-                active.append(ch)
-            except Exception:
-                logger.info("Removing stale channel %d from DB", ch["id"])
-                await self._repo.remove_channel(ch["id"])
-        return active
+                await self._bot.get_chat(channel_id)
+            except TelegramMigrateToChat as e:
+                self._schedule(
+                    channel_id, self.migrate_channel(channel_id, e.migrate_to_chat_id)
+                )
+                return False
+            except (TelegramForbiddenError, TelegramBadRequest) as e:
+                logger.info("Bot is no longer in channel %d: %s", channel_id, e)
+                self._schedule(channel_id, self.deactivate_channel(channel_id))
+                return False
+            except TelegramAPIError as e:
+                # Can't tell right now; keep the channel and check again later
+                logger.warning("Membership check for %d failed: %s", channel_id, e)
+                return True
+        self.membership_cache.set(channel_id, True)
+        return True
+
+    def _schedule(self, channel_id: int, update: Coroutine[Any, Any, None]) -> None:
+        """Apply a membership change in the background, once per channel."""
+        if channel_id in self._pending:
+            update.close()
+            return
+        task = asyncio.create_task(self._apply(channel_id, update))
+        self._pending[channel_id] = task
+        task.add_done_callback(lambda _: self._pending.pop(channel_id, None))
+
+    @staticmethod
+    async def _apply(channel_id: int, update: Coroutine[Any, Any, None]) -> None:
+        try:
+            await update
+        except Exception:
+            logger.exception("Failed to update stale channel %d", channel_id)
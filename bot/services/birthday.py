@@ -1,14 +1,48 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import NamedTuple
 
+from bot.db.models import Birthday
 from bot.db.repositories import Repository
-from bot.utils.date_helpers import today_in_timezone
+from bot.utils.cache import LRUCache
+from bot.utils.date_helpers import (
+    format_birthday_list,
+    local_today,
+    next_birthday,
+    today_in_timezone,
+    upcoming_window,
+)
+
+# Lines per page of a birthday list; keeps a page well under 4096 characters
+BIRTHDAYS_PAGE_SIZE = 25
+
+UPCOMING_DEFAULT_DAYS = 30
+# Birthdays listed by /upcoming at most. A line is under 150 characters
+# (64-character name, 32-character username), so the list fits one message
+UPCOMING_LIMIT = 25
+
+# (birth_month, birth_day, birthday id)
+Cursor = tuple[int, int, int]
+
+
+class BirthdayPage(NamedTuple):
+    text: str  # formatted lines, empty if the page has no birthdays
+    prev_cursor: Cursor | None  # ``before`` for the previous page, if any
+    next_cursor: Cursor | None  # ``after`` for the next page, if any
 
 
 class BirthdayService:
-    def __init__(self, repo: Repository) -> None:
+    """Birthday CRUD and paginated birthday lists.
+
+    Rendered list pages are cached per channel, keyed by the channel's
+    ``Repository.birthdays_version``, which every birthday or known_users
+    write bumps; repeated ``/birthdays`` calls are served from memory.
+    """
+
+    def __init__(self, repo: Repository, page_cache_size: int = 1000) -> None:
         self._repo = repo
+        # (channel_id, version, after, before, show_id) -> rendered page
+        self.page_cache: LRUCache[tuple, BirthdayPage] = LRUCache(page_cache_size)
 
     async def set_birthday(
         self,
@@ -26,17 +60,75 @@ class BirthdayService:
 
     async def get_birthday(
         self, channel_id: int, user_id: int
-    ) -> dict[str, Any] | None:
+    ) -> Birthday | None:
         return await self._repo.get_birthday(channel_id, user_id)
 
-    async def list_birthdays(self, channel_id: int) -> list[dict[str, Any]]:
-        return await self._repo.get_birthdays_for_channel(channel_id)
+    async def birthday_page(
+        self,
+        channel_id: int,
+        after: Cursor | None = None,
+        before: Cursor | None = None,
+        *,
+        show_id: bool = False,
+    ) -> BirthdayPage:
+        """A rendered page of the channel's birthdays in date order."""
+        key = (
+            channel_id,
+            self._repo.birthdays_version(channel_id),
+            after,
+            before,
+            show_id,
+        )
+        page = self.page_cache.get(key)
+        if page is not None:
+            return page
+
+        rows = await self._repo.get_birthdays_page(
+            channel_id, after, before, BIRTHDAYS_PAGE_SIZE + 1
+        )
+        if before is not None:
+            has_prev, has_next = len(rows) > BIRTHDAYS_PAGE_SIZE, True
+            rows = rows[-BIRTHDAYS_PAGE_SIZE:]
+        else:
+            has_prev, has_next = after is not None, len(rows) > BIRTHDAYS_PAGE_SIZE
+            rows = rows[:BIRTHDAYS_PAGE_SIZE]
+        page = BirthdayPage(
+            "\n".join(format_birthday_list(rows, show_id=show_id)),
+            _cursor(rows[0]) if has_prev and rows else None,
+            _cursor(rows[-1]) if has_next and rows else None,
+        )
+        self.page_cache.set(key, page)
+        return page
 
     async def remove_birthday(self, channel_id: int, user_id: int) -> bool:
         return await self._repo.remove_birthday(channel_id, user_id)
 
+    async def upcoming_birthdays(
+        self, channel_id: int, days: int = UPCOMING_DEFAULT_DAYS
+    ) -> tuple[list[tuple[Birthday, int]], bool]:
+        """Birthdays in the next ``days`` days of the channel's timezone.
+
+        Returns (birthday, days until it) pairs, soonest first, and whether
+        there were more than ``UPCOMING_LIMIT``.
+        """
+        channel = await self._repo.get_channel(channel_id)
+        today = local_today(channel.timezone if channel else "UTC")
+        first, last = upcoming_window(today, days)
+        rows = await self._repo.get_upcoming_birthdays(
+            channel_id, first, last, UPCOMING_LIMIT + 1
+        )
+        entries = [
+            (bd, (next_birthday(bd.birth_day, bd.birth_month, today) - today).days)
+            for bd in rows[:UPCOMING_LIMIT]
+        ]
+        return entries, len(rows) > UPCOMING_LIMIT
+
     async def get_todays_birthdays(
         self, channel_id: int, timezone: str
-    ) -> list[dict[str, Any]]:
+    ) -> list[Birthday]:
         day, month = today_in_timezone(timezone)
         return await self._repo.get_birthdays_by_date(channel_id, day, month)
+
+
+def _cursor(bd: Birthday) -> Cursor:
+    return bd.birth_month, bd.birth_day, bd.id
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import time
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+
+from bot.db.repositories import Repository
+from bot.utils.cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+# How often abandoned dialogs are deleted from the database
+PRUNE_INTERVAL = 3600
+
+
+class _Record:
+    __slots__ = ("state", "data", "updated_at")
+
+    def __init__(
+        self, state: str | None, data: dict[str, Any], updated_at: float
+    ) -> None:
+        self.state = state
+        self.data = data
+        self.updated_at = updated_at
+
+
+_EMPTY = _Record(None, {}, 0.0)
+
+
+class SQLiteStorage(BaseStorage):
+    """aiogram FSM storage kept in the bot's SQLite database.
+
+    Admin dialogs survive restarts. Records are cached in memory and
+    written through on every change, so reads (one per update) don't hit
+    the database; keys with no record are cached too. A dialog not
+    written to for ``ttl`` seconds is treated as finished and is deleted
+    by a background task every ``PRUNE_INTERVAL`` seconds.
+
+    The cache is per process: when several processes share the database,
+    set ``cache_size`` to 0 so each read goes to SQLite.
+    """
+
+    def __init__(
+        self,
+        repo: Repository,
+        ttl: float = 86400,
+        cache_size: int = 1000,
+        key_builder: KeyBuilder | None = None,
+    ) -> None:
+        self._repo = repo
+        self._ttl = ttl
+        self._key_builder = key_builder or DefaultKeyBuilder()
+        self.cache: LRUCache[str, _Record] = LRUCache(cache_size)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self._key_builder.build(key)
+        record = await self._record(storage_key)
+        await self._write(
+            storage_key,
+            state.state if isinstance(state, State) else state,
+            record.data,
+        )
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._record(self._key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        storage_key = self._key_builder.build(key)
+        record = await self._record(storage_key)
+        await self._write(storage_key, record.state, data.copy())
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return (await self._record(self._key_builder.build(key))).data.copy()
+
+    async def prune(self) -> int:
+        """Delete dialogs idle for longer than ``ttl``. Returns the number deleted."""
+        # Expired cache entries are already ignored by _record()
+        return await self._repo.prune_fsm_records(time.time() - self._ttl)
+
+    async def _record(self, key: str) -> _Record:
+        record = self.cache.get(key)
+        if record is not None and (
+            record is _EMPTY or record.updated_at > time.time() - self._ttl
+        ):
+            return record
+        row = await self._repo.get_fsm_record(key, time.time() - self._ttl)
+        record = _Record(row[0], json.loads(row[1]), row[2]) if row else _EMPTY
+        self.cache.set(key, record)
+        return record
+
+    async def _write(
+        self, key: str, state: str | None, data: dict[str, Any]
+    ) -> None:
+        if state is None and not data:
+            self.cache.set(key, _EMPTY)
+            await self._repo.delete_fsm_record(key)
+            return
+        record = _Record(state, data, time.time())
+        self.cache.set(key, record)
+        await self._repo.set_fsm_record(
+            key, state, json.dumps(data, ensure_ascii=False), record.updated_at
+        )
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                pruned = await self.prune()
+            except Exception:
+                logger.exception("Failed to prune FSM storage")
+            else:
+                if pruned:
+                    logger.info("Pruned %d abandoned admin dialogs", pruned)
+            await asyncio.sleep(PRUNE_INTERVAL)
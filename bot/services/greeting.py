@@ -2,119 +2,141 @@ from __future__ import annotations
 
 import logging
 import random
+from typing import Any, Sequence
 
 from aiogram import Bot
 
-from bot.utils.date_helpers import month_name
+from bot.catalogs import Catalog, available_locales, get_catalog
+from bot.db.models import GreetingTemplate, OutboxEntry
+from bot.db.repositories import Repository
+from bot.services.media import MediaSender
+from bot.services.send_queue import SendQueue
+from bot.utils.cache import LRUCache
+from bot.utils.templates import (
+    CompiledTemplate,
+    MediaRef,
+    compile_template,
+    rotation_index,
+)
 
 logger = logging.getLogger(__name__)
 
-DEFAULT_TEMPLATES = [
-    "С днём рождения, {name}! 🎂🎉 Пусть всё сбывается!",
-    "Поздравляю с днём рождения, {name}! 🥳 Счастья и радости!",
-    "{name}, с праздником! 🎁 Желаю тепла и улыбок!",
-    "С днём рождения, {name}! 🎈 Пусть этот день будет особенным!",
-    "Ура, у {name} день рождения! 🎊 Здоровья и удачи!",
-    "{name}, поздравляю! 🌟 Желаю ярких моментов и вдохновения!",
-    "С днём рождения, {name}! 🎂 Пусть мечты становятся реальностью!",
-    "Happy Birthday, {name}! 🥂 Счастья, любви и всего самого лучшего!",
-    "{name}, с днём рождения! 🎉 Пусть каждый день приносит радость!",
-    "Поздравляем {name}! 🎈🎈 Желаем море позитива и хорошего настроения!",
-    "С днём рождения, {name}! 🌸 Тепла, уюта и душевной гармонии!",
-    "{name}, с праздником! 🎂 Пусть год будет щедрым на приятные сюрпризы!",
-    "Сегодня день рождения у {name}! 🎁 Поздравляем от всей души!",
-    "{name}, с днём рождения! ☀️ Пусть солнце светит ярче для тебя!",
-    "Поздравляю, {name}! 🎊 Желаю лёгкости и вдохновения каждый день!",
-    "С днём рождения, {name}! 🍰 Пусть жизнь будет сладкой!",
-    "{name}, ура, праздник! 🥳 Желаю энергии и отличного настроения!",
-    "С праздником, {name}! 🎉 Пусть всё получается легко и красиво!",
-    "{name}, с днём рождения! 💫 Пусть удача всегда будет рядом!",
-    "Поздравляем {name} с днём рождения! 🎂 Здоровья, счастья, любви!",
-    "{name}, с днём рождения! 🌈 Пусть каждый день раскрашен яркими красками!",
-    "С днём рождения, {name}! 🎶 Желаю гармонии и добрых людей рядом!",
-    "{name}, поздравляю! 🎁 Пусть этот год принесёт много хорошего!",
-    "С днюхой, {name}! 🔥 Будь счастлив и здоров!",
-    "{name}, с днём рождения! 🎈 Пусть сбудется то, о чём мечтаешь!",
-    "Поздравляю с днём рождения, {name}! 🌟 Улыбок и тёплых моментов!",
-    "Сегодня праздник у {name}! 🎂 Желаем всего самого наилучшего!",
-    "{name}, с днём рождения! 🌻 Пусть в жизни будет много солнечных дней!",
-    "С днём рождения, {name}! 🎊 Оставайся таким же замечательным!",
-    "{name}, поздравляю! 🥂 Пусть новый год жизни будет лучше прежнего!",
-    "С днём рождения, {name}! 🎉 Радости, здоровья и исполнения желаний!",
-    "{name}, с праздником! 💐 Желаю любви и взаимопонимания!",
-    "Поздравляем {name}! 🎂 Пусть день будет наполнен теплом и заботой!",
-    "С днём рождения, {name}! ✨ Желаю волшебства в каждом дне!",
-    "{name}, с днём рождения! 🎁 Пусть всё складывается наилучшим образом!",
-    "Ура! У {name} сегодня день рождения! 🎈 Поздравляем! 🥳",
-    "С днём рождения, {name}! 🍀 Желаю удачи во всех начинаниях!",
-    "{name}, поздравляю с днём рождения! 🎶 Пусть жизнь звучит красиво!",
-    "С днём рождения, {name}! 🌺 Пусть рядом всегда будут близкие люди!",
-    "{name}, с праздником! 🎂 Желаю бодрости духа и хорошего настроения!",
-    "Поздравляю, {name}! 🎉 Новых побед, свершений и приключений!",
-    "С днём рождения, {name}! 🫶 Пусть каждый день дарит что-то хорошее!",
-    "{name}, с днём рождения! 🎈 Желаю лёгкости на душе и огня в сердце!",
-    "С праздником, {name}! 🎊 Пусть год будет полон приятных открытий!",
-    "{name}, поздравляю! 🌟 Пусть впереди ждёт только хорошее!",
-    "С днём рождения, {name}! 🎂 Желаю крепкого здоровья и бодрого духа!",
-    "{name}, с днём рождения! 🥳 Пусть этот день запомнится надолго!",
-    "Поздравляю, {name}! 💫 Пусть мир вокруг будет добрым и светлым!",
-    "С днём рождения, {name}! 🎁 Пусть каждое утро начинается с улыбки!",
-    "{name}, с днём рождения! 🎉 Счастья столько, сколько звёзд на небе! ⭐",
-    "С днём рождения, {name}! 🕊 Пусть душа поёт и сердце радуется!",
-    "{name}, поздравляю! 🎂 Пусть рядом будут только верные друзья!",
-    "С днём рождения, {name}! 🧡 Желаю искренних чувств и настоящего счастья!",
-    "{name}, с праздником! 🎈 Пусть жизнь удивляет только приятно!",
-    "С днём рождения, {name}! 🌙 Пусть каждый вечер приносит покой, а утро — надежду!",
-    "{name}, ура! 🎊 Пусть этот день будет началом чего-то прекрасного!",
-    "Поздравляю, {name}! 🍾 Желаю поводов для радости каждый день!",
-    "С днём рождения, {name}! 🌿 Пусть в жизни будет больше тёплых моментов!",
-    "{name}, с днём рождения! 🎵 Пусть всё звучит в унисон с твоими мечтами!",
-    "С днём рождения, {name}! 💎 Ты — настоящее сокровище! Цени себя!",
-    "{name}, поздравляю! 🌤 Пусть даже в пасмурный день тебе будет светло!",
-    "С днём рождения, {name}! 🎀 Желаю красивых событий и добрых встреч!",
-    "{name}, с праздником! 🏖 Пусть в жизни будет столько счастья, сколько песчинок на пляже!",
-    "С днём рождения, {name}! 🪄 Пусть сегодня случится маленькое чудо!",
-    "{name}, с днём рождения! 🍫 Желаю, чтобы жизнь была полна приятных мелочей!",
-    "Поздравляю, {name}! 🌊 Пусть энергия и вдохновение не покидают тебя!",
-    "С днём рождения, {name}! 🏡 Тепла и уюта в доме, мира и любви в сердце!",
-    "{name}, с днём рождения! 🫂 Пусть тебя всегда окружают те, кто ценит!",
-    "С днём рождения, {name}! 🎯 Пусть все цели будут достигнуты, а планы — реализованы!",
-    "{name}, поздравляю! 🌠 Загадай желание — сегодня оно точно сбудется!",
-    "С днём рождения, {name}! 🧁 Пусть жизнь будет вкусной и разнообразной!",
-    "{name}, с днём рождения! 🪻 Желаю расцветать и радовать мир собой!",
-    "Поздравляю, {name}! 🛤 Пусть дорога жизни ведёт к самому лучшему!",
-    "С днём рождения, {name}! 🎠 Пусть детская радость никогда не покидает тебя!",
-    "{name}, с праздником! 🌅 Пусть каждый новый день начинается с надежды!",
-    "С днём рождения, {name}! 🦋 Пусть перемены будут только к лучшему!",
-    "{name}, поздравляю! 🎇 Желаю фейерверка эмоций и море впечатлений!",
-    "С днём рождения, {name}! ☕ Пусть в жизни будет время для себя и близких!",
-    "{name}, с днём рождения! 📖 Пусть новая глава жизни будет самой интересной!",
-    "Поздравляю, {name}! 🏔 Желаю покорить все вершины, к которым стремишься!",
-    "С днём рождения, {name}! 🎪 Пусть жизнь будет яркой, как праздник!",
-    "{name}, с праздником! 🌾 Желаю щедрого урожая от всего, что ты делаешь!",
-    "С днём рождения, {name}! 🧸 Пусть в сердце всегда живёт доброта!",
-    "{name}, поздравляю! 💌 Пусть каждый день приносит приятные новости!",
-    "С днём рождения, {name}! 🪴 Расти, развивайся и будь счастлив!",
-    "{name}, с днём рождения! 🎭 Желаю ярких ролей на сцене жизни!",
-    "Поздравляю, {name}! 🌍 Пусть мир будет открыт для тебя во всей красе!",
-    "С днём рождения, {name}! 🫧 Пусть проблемы лопаются, как мыльные пузыри!",
-    "{name}, с праздником! 🧭 Желаю всегда находить верный путь!",
-    "С днём рождения, {name}! 🎨 Пусть жизнь будет наполнена яркими красками!",
-    "{name}, поздравляю! 🏅 Ты заслуживаешь всего самого лучшего!",
-    "С днём рождения, {name}! ⛵ Пусть попутный ветер несёт к новым берегам!",
-    "{name}, с днём рождения! 🍀 Пусть удача станет верным спутником!",
-    "Поздравляю, {name}! 🔑 Желаю открыть все двери, за которыми ждёт счастье!",
-    "С днём рождения, {name}! 🌼 Пусть жизнь цветёт и пахнет!",
-    "{name}, с праздником! 🎤 Пусть твой голос будет услышан!",
-    "С днём рождения, {name}! 🫰 Пусть всё будет легко и просто!",
-    "{name}, с днём рождения! 🌄 Пусть впереди ждут только светлые горизонты!",
-    "Поздравляю, {name}! 🎲 Пусть судьба всегда выбрасывает лучший расклад!",
-]
+# Telegram's limit for the text of one message
+MESSAGE_LIMIT = 4096
+
+MAX_CUSTOM_TEMPLATES = 50
 
 
 class GreetingService:
-    def __init__(self, bot: Bot) -> None:
+    """Composes and sends birthday greetings.
+
+    Each channel has a locale that selects its built-in catalog
+    (``bot.catalogs``). A channel with custom templates uses only those;
+    other channels use the catalog's templates. Templates rotate per
+    channel like a shuffle bag: no template repeats until all of them have
+    been used. The rotation is a (seed, cursor) pair in
+    ``template_rotation``, advanced with one upsert per greeting. Templates
+    are compiled once and the compiled set of each channel is kept in an
+    LRU cache, invalidated when the channel's templates or locale change,
+    so sending does not parse templates or query them. Templates with
+    media are sent through ``MediaSender``, which uploads each file once.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        send_queue: SendQueue,
+        repo: Repository,
+        media_sender: MediaSender,
+        template_cache_size: int = 1000,
+    ) -> None:
         self._bot = bot
+        self._queue = send_queue
+        self._repo = repo
+        self._media = media_sender
+        # channel_id -> (catalog, compiled templates used for that channel)
+        self.template_cache: LRUCache[
+            int, tuple[Catalog, tuple[CompiledTemplate, ...]]
+        ] = LRUCache(template_cache_size)
+
+    @property
+    def queue_stats(self) -> dict[str, Any]:
+        return self._queue.stats
+
+    @property
+    def media_stats(self) -> dict[str, Any]:
+        return self._media.stats
+
+    # ── Templates ─────────────────────────────────────────────────────
+
+    async def list_templates(self, channel_id: int) -> list[GreetingTemplate]:
+        return await self._repo.get_templates(channel_id)
+
+    async def add_template(self, channel_id: int, text: str, created_by: int) -> int:
+        """Validate and store a custom template. Returns its ID.
+
+        Raises ValueError if the template is invalid or the channel already
+        has the maximum number of templates.
+        """
+        template = compile_template(text)
+        if len(await self._repo.get_templates(channel_id)) >= MAX_CUSTOM_TEMPLATES:
+            raise ValueError(
+                f"A channel can have at most {MAX_CUSTOM_TEMPLATES} templates"
+            )
+        template_id = await self._repo.add_template(
+            channel_id, template.source, created_by
+        )
+        self.template_cache.pop(channel_id)
+        await self._repo.reset_template_rotation(channel_id)
+        return template_id
+
+    async def remove_template(self, channel_id: int, template_id: int) -> bool:
+        removed = await self._repo.remove_template(channel_id, template_id)
+        if removed:
+            self.template_cache.pop(channel_id)
+            await self._repo.reset_template_rotation(channel_id)
+        return removed
+
+    async def set_locale(self, channel_id: int, locale: str) -> None:
+        """Switch the channel's catalog. Raises ValueError for unknown locales."""
+        if locale not in available_locales():
+            raise ValueError(
+                f"Unknown locale {locale!r}; available: "
+                + ", ".join(available_locales())
+            )
+        await self._repo.update_channel_locale(channel_id, locale)
+        self.template_cache.pop(channel_id)
+        await self._repo.reset_template_rotation(channel_id)
+
+    async def templates_for(
+        self, channel_id: int
+    ) -> tuple[Catalog, tuple[CompiledTemplate, ...]]:
+        cached = self.template_cache.get(channel_id)
+        if cached is not None:
+            return cached
+        channel = await self._repo.get_channel(channel_id)
+        catalog = get_catalog(channel.locale if channel else "")
+        compiled = []
+        for row in await self._repo.get_templates(channel_id):
+            try:
+                compiled.append(compile_template(row.text))
+            except ValueError as e:
+                logger.warning("Skipping invalid template %d: %s", row.id, e)
+        cached = (catalog, tuple(compiled) or catalog.templates)
+        self.template_cache.set(channel_id, cached)
+        return cached
+
+    async def next_template(
+        self, channel_id: int
+    ) -> tuple[Catalog, CompiledTemplate]:
+        """The channel's catalog and next template in its shuffle-bag rotation."""
+        catalog, templates = await self.templates_for(channel_id)
+        seed, cursor = await self._repo.next_template_slot(
+            channel_id, len(templates), random.getrandbits(31)
+        )
+        return catalog, templates[rotation_index(seed, cursor, len(templates))]
+
+    # ── Sending ───────────────────────────────────────────────────────
 
     async def send_greeting(
         self,
@@ -125,9 +147,11 @@ class GreetingService:
         day: int,
         month: int,
     ) -> None:
-        text = random.choice(DEFAULT_TEMPLATES)
-        rendered = self._render(text, first_name, username, day, month, user_id)
-        await self._bot.send_message(channel_id, rendered)
+        catalog, template = await self.next_template(channel_id)
+        rendered = self._render(
+            catalog, template, first_name, username, day, month, user_id
+        )
+        await self.send_text(channel_id, rendered, template.media)
 
         logger.info(
             "Sent birthday greeting in channel %d for user %d",
@@ -135,27 +159,124 @@ class GreetingService:
             user_id,
         )
 
+    async def send_text(
+        self, channel_id: int, text: str, media: MediaRef | None = None
+    ) -> None:
+        if media is None:
+            await self._queue.send(
+                channel_id, lambda: self._bot.send_message(channel_id, text)
+            )
+        elif self._media.carries_caption(media, text):
+            await self._queue.send(
+                channel_id, lambda: self._media.send(channel_id, media, text)
+            )
+        else:
+            # Separate queue items, so retrying the text doesn't resend the media
+            await self._queue.send(
+                channel_id, lambda: self._media.send(channel_id, media, None)
+            )
+            await self._queue.send(
+                channel_id, lambda: self._bot.send_message(channel_id, text)
+            )
+
+    async def render_combined(
+        self, people: Sequence[OutboxEntry]
+    ) -> list[tuple[str, list[OutboxEntry], MediaRef | None]]:
+        """Render one greeting for everyone in ``people`` (same channel and day).
+
+        Returns (text, people in it, media) triples: more than one when the
+        combined text would exceed Telegram's message length limit. Only
+        the first carries the template's media.
+        """
+        catalog, template = await self.next_template(people[0].channel_id)
+        chunks: list[tuple[str, list[OutboxEntry], MediaRef | None]] = []
+        current: list[OutboxEntry] = []
+        rendered = ""
+        for person in people:
+            candidate = self._render_many(catalog, template, [*current, person])
+            if len(candidate) > MESSAGE_LIMIT and current:
+                chunks.append((rendered, current, None))
+                current = [person]
+                rendered = self._render_many(catalog, template, current)
+            else:
+                current.append(person)
+                rendered = candidate
+        if current:
+            chunks.append((rendered, current, None))
+        if chunks and template.media is not None:
+            text, first, _ = chunks[0]
+            chunks[0] = (text, first, template.media)
+        return chunks
+
+    def _render_many(
+        self,
+        catalog: Catalog,
+        template: CompiledTemplate,
+        people: Sequence[OutboxEntry],
+    ) -> str:
+        mentions = [
+            self._mention(catalog, p.first_name, p.username, p.user_id)
+            for p in people
+        ]
+        if len(mentions) == 1:
+            names = mentions[0]
+        else:
+            names = (
+                ", ".join(mentions[:-1]) + f" {catalog.conjunction} " + mentions[-1]
+            )
+        return self._format(
+            catalog,
+            template,
+            names,
+            names,
+            people[0].birth_day,
+            people[0].birth_month,
+        )
+
     def _render(
         self,
-        text: str,
+        catalog: Catalog,
+        template: CompiledTemplate,
         first_name: str | None,
         username: str | None,
         day: int,
         month: int,
         user_id: int,
+    ) -> str:
+        name = self._mention(catalog, first_name, username, user_id)
+        return self._format(
+            catalog,
+            template,
+            name,
+            f"@{username}" if username else name,
+            day,
+            month,
+        )
+
+    @staticmethod
+    def _mention(
+        catalog: Catalog, first_name: str | None, username: str | None, user_id: int
     ) -> str:
         if username:
-            name = f"@{username}"
-        elif first_name:
-            name = f'<a href="tg://user?id={user_id}">{first_name}</a>'
-        else:
-            name = "друг"
-        try:
-            return text.format(
-                name=name,
-                username=f"@{username}" if username else name,
-                day=day,
-                month=month_name(month),
-            )
-        except (KeyError, IndexError):
-            return text
+            return f"@{username}"
+        if first_name:
+            return f'<a href="tg://user?id={user_id}">{first_name}</a>'
+        return catalog.friend
+
+    @staticmethod
+    def _format(
+        catalog: Catalog,
+        template: CompiledTemplate,
+        name: str,
+        username: str,
+        day: int,
+        month: int,
+    ) -> str:
+        return template.render(
+            {
+                "name": name,
+                "username": username,
+                "day": str(day),
+                "month": catalog.month_name(month),
+            }
+        )
@@ -0,0 +1,154 @@
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile, Message
+
+from bot.db.repositories import Repository
+from bot.utils.templates import MediaRef
+
+logger = logging.getLogger(__name__)
+
+# Captions longer than this are sent as a separate text message
+CAPTION_LIMIT = 1024
+
+
+def _sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _file_id(message: Message, kind: str) -> str | None:
+    if kind == "photo" and message.photo:
+        return message.photo[-1].file_id
+    if kind == "animation" and message.animation:
+        return message.animation.file_id
+    if kind == "sticker" and message.sticker:
+        return message.sticker.file_id
+    # Telegram may store an upload as a plain document
+    return message.document.file_id if message.document else None
+
+
+class MediaSender:
+    """Sends greeting media, uploading each distinct file only once.
+
+    Files are identified by the SHA-256 of their contents and the media
+    type they are sent as. After the first upload the returned Telegram
+    ``file_id`` is stored in ``media_cache`` and reused for every later
+    send, across channels and restarts. A ``file_id`` that Telegram no
+    longer accepts is dropped and the file is uploaded again.
+    """
+
+    def __init__(self, bot: Bot, repo: Repository) -> None:
+        self._bot = bot
+        self._repo = repo
+        # path -> (mtime_ns, size, sha256), so unchanged files aren't rehashed
+        self._hashes: dict[Path, tuple[int, int, str]] = {}
+        # (sha256, kind) -> file_id
+        self._file_ids: dict[tuple[str, str], str] = {}
+        # (sha256, kind) -> upload in progress, shared by concurrent first sends
+        self._uploads: dict[tuple[str, str], asyncio.Future[str | None]] = {}
+        self.hits = 0
+        self.uploads = 0
+        self.bytes_uploaded = 0
+        self.bytes_saved = 0
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        sends = self.hits + self.uploads
+        return {
+            "hits": self.hits,
+            "uploads": self.uploads,
+            "hit_rate": self.hits / sends if sends else 0.0,
+            "bytes_uploaded": self.bytes_uploaded,
+            "bytes_saved": self.bytes_saved,
+        }
+
+    @staticmethod
+    def carries_caption(media: MediaRef, caption: str) -> bool:
+        """Whether ``caption`` can be sent with ``media`` rather than after it."""
+        return media.kind != "sticker" and len(caption) <= CAPTION_LIMIT
+
+    async def send(self, chat_id: int, media: MediaRef, caption: str | None) -> None:
+        """Send ``media`` with ``caption``, which must fit (``carries_caption``)."""
+        sha256, size = await self._hash(media.path)
+        key = (sha256, media.kind)
+        file_id = await self._cached_file_id(key)
+        if file_id is not None:
+            try:
+                await self._send(chat_id, media.kind, file_id, caption)
+            except TelegramBadRequest as e:
+                if "file" not in e.message.lower():
+                    raise
+                logger.warning("Cached file_id for %s rejected: %s", media.path, e)
+                self._file_ids.pop(key, None)
+                await self._repo.delete_media_file_id(*key)
+            else:
+                self.hits += 1
+                self.bytes_saved += size
+                return
+
+        upload = self._uploads.get(key)
+        if upload is not None:
+            # Another send is uploading the same file; reuse its file_id
+            file_id = await asyncio.shield(upload)
+            if file_id is not None:
+                await self._send(chat_id, media.kind, file_id, caption)
+                self.hits += 1
+                self.bytes_saved += size
+                return
+
+        upload = self._uploads[key] = asyncio.get_running_loop().create_future()
+        try:
+            message = await self._send(
+                chat_id, media.kind, FSInputFile(media.path), caption
+            )
+            file_id = _file_id(message, media.kind)
+            upload.set_result(file_id)
+        except BaseException:
+            upload.set_result(None)
+            raise
+        finally:
+            del self._uploads[key]
+
+        self.uploads += 1
+        self.bytes_uploaded += size
+        if file_id is not None:
+            self._file_ids[key] = file_id
+            await self._repo.set_media_file_id(sha256, media.kind, file_id, size)
+            logger.info("Uploaded %s (%d bytes) as %s", media.path, size, file_id)
+
+    async def _cached_file_id(self, key: tuple[str, str]) -> str | None:
+        file_id = self._file_ids.get(key)
+        if file_id is None:
+            file_id = await self._repo.get_media_file_id(*key)
+            if file_id is not None:
+                self._file_ids[key] = file_id
+        return file_id
+
+    async def _hash(self, path: Path) -> tuple[str, int]:
+        stat = path.stat()
+        known = self._hashes.get(path)
+        if known is not None and known[:2] == (stat.st_mtime_ns, stat.st_size):
+            return known[2], stat.st_size
+        sha256 = await asyncio.to_thread(_sha256, path)
+        self._hashes[path] = (stat.st_mtime_ns, stat.st_size, sha256)
+        return sha256, stat.st_size
+
+    async def _send(
+        self, chat_id: int, kind: str, file: str | FSInputFile, caption: str | None
+    ) -> Message:
+        if kind == "photo":
+            return await self._bot.send_photo(chat_id, file, caption=caption)
+        if kind == "animation":
+            return await self._bot.send_animation(chat_id, file, caption=caption)
+        return await self._bot.send_sticker(chat_id, file)
@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import datetime
+import logging
+import time
+
+from aiogram.exceptions import TelegramForbiddenError
+
+from bot.db.models import OutboxEntry
+from bot.db.repositories import Repository
+from bot.services.greeting import GreetingService
+from bot.utils.date_helpers import birthday_in
+
+logger = logging.getLogger(__name__)
+
+# Retry delays grow as BASE * 2**(attempt - 1), capped at MAX
+_BACKOFF_BASE = 30.0
+_BACKOFF_MAX = 3600.0
+
+
+class GreetingOutbox:
+    """Durable queue of birthday greetings waiting to be sent.
+
+    The scheduler only enqueues; a worker claims due rows in batches and
+    sends them through ``GreetingService``. A failed send is retried with
+    exponential backoff until ``max_attempts``. A sent greeting is written
+    to the ``greetings_sent`` ledger, keyed by (channel_id, user_id, year),
+    in the same transaction that removes it from the outbox, and greetings
+    already in the ledger are never enqueued again. ``stop()`` lets the
+    batch in progress finish, so only a crash (or a batch outlasting the
+    shutdown timeout) between Telegram accepting a message and that commit
+    can repeat a greeting. Pending rows survive a restart and are picked up
+    when the worker starts.
+    """
+
+    def __init__(
+        self,
+        repo: Repository,
+        greeting_service: GreetingService,
+        batch_size: int = 100,
+        max_attempts: int = 8,
+        poll_interval: float = 30,
+        lease: float = 600,
+    ) -> None:
+        self._repo = repo
+        self._greeting = greeting_service
+        self._batch_size = batch_size
+        self._max_attempts = max_attempts
+        self._poll_interval = poll_interval
+        self._lease = lease
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+        self.sent = 0
+        self.retried = 0
+        self.dropped = 0
+
+    async def start(self) -> None:
+        if self._task is not None:
+            return
+        # Claims left by a previous process will never be completed
+        await self._repo.release_outbox_claims()
+        # The ledger only has to cover greetings that could still be due
+        pruned = await self._repo.prune_sent_greetings(
+            datetime.date.today().year - 1
+        )
+        if pruned:
+            logger.info("Pruned %d old entries from the greeting ledger", pruned)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 30) -> None:
+        """Stop claiming batches and wait up to ``timeout`` seconds for the
+        batch in progress, so greetings already sent are recorded."""
+        if self._task:
+            self._stopping = True
+            self._wakeup.set()
+            try:
+                await asyncio.wait_for(asyncio.shield(self._task), timeout)
+            except asyncio.TimeoutError:
+                logger.warning(
+                    "Outbox batch still sending after %ds; greetings sent "
+                    "but not yet recorded will be sent again",
+                    timeout,
+                )
+                self._task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await self._task
+            self._task = None
+            self._stopping = False
+        logger.info("Greeting outbox stopped: %s", self.stats)
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"sent": self.sent, "retried": self.retried, "dropped": self.dropped}
+
+    async def enqueue(
+        self, rows: list[tuple[int, int, int, str | None, str | None, int, int]]
+    ) -> int:
+        """Queue (channel_id, user_id, year, username, first_name, day, month) rows."""
+        if not rows:
+            return 0
+        queued = await self._repo.enqueue_greetings(rows, time.time())
+        if queued:
+            self._wakeup.set()
+        return queued
+
+    async def drain(self) -> int:
+        """Send every greeting that is due now; returns how many were claimed."""
+        total = 0
+        while not self._stopping:
+            batch = await self._repo.claim_outbox(
+                self._batch_size, time.time(), self._lease
+            )
+            if not batch:
+                return total
+            batch.extend(await self._claim_combined(batch))
+            total += len(batch)
+            # One group per channel and the local date the greeting is for,
+            # so 29 February birthdays join 28 February in non-leap years
+            groups: dict[tuple[int, datetime.date], list[OutboxEntry]] = {}
+            for entry in batch:
+                key = (
+                    entry.channel_id,
+                    birthday_in(entry.year, entry.birth_day, entry.birth_month),
+                )
+                groups.setdefault(key, []).append(entry)
+            await asyncio.gather(
+                *(self._deliver_group(entries) for entries in groups.values())
+            )
+            logger.info(
+                "Outbox batch of %d done (%s); send queue: %s; media: %s",
+                len(batch),
+                self.stats,
+                self._greeting.queue_stats,
+                self._greeting.media_stats,
+            )
+        return total
+
+    async def _claim_combined(self, batch: list[OutboxEntry]) -> list[OutboxEntry]:
+        """Claim the rest of the due greetings of channels in ``batch`` that
+        combine greetings, so a day's greeting is not split across batches."""
+        rest: list[OutboxEntry] = []
+        for channel_id in {entry.channel_id for entry in batch}:
+            channel = await self._repo.get_channel(channel_id)
+            if channel is not None and channel.combine_greetings:
+                rest.extend(
+                    await self._repo.claim_channel_outbox(
+                        channel_id, time.time(), self._lease
+                    )
+                )
+        return rest
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await self.drain()
+            except Exception:
+                logger.exception("Greeting outbox drain failed")
+            if self._stopping:
+                return
+            self._wakeup.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), self._poll_interval)
+
+    async def _deliver_group(self, entries: list[OutboxEntry]) -> None:
+        channel = await self._repo.get_channel(entries[0].channel_id)
+        if len(entries) == 1 or channel is None or not channel.combine_greetings:
+            for entry in entries:
+                await self._deliver(entry)
+            return
+
+        # The greeting shows the first person's date: 28 February before 29th
+        entries.sort(key=lambda entry: (entry.birth_month, entry.birth_day))
+        for text, people, media in await self._greeting.render_combined(entries):
+            try:
+                await self._greeting.send_text(channel.id, text, media)
+            except Exception as e:
+                for entry in people:
+                    await self._failed(entry, e)
+                continue
+            self.sent += len(people)
+            async with self._repo.transaction():
+                for entry in people:
+                    await self._repo.complete_greeting(entry)
+            logger.info(
+                "Sent combined greeting in channel %d for %d users",
+                channel.id,
+                len(people),
+            )
+
+    async def _deliver(self, entry: OutboxEntry) -> None:
+        try:
+            await self._greeting.send_greeting(
+                entry.channel_id,
+                entry.user_id,
+                entry.username,
+                entry.first_name,
+                entry.birth_day,
+                entry.birth_month,
+            )
+        except Exception as e:
+            await self._failed(entry, e)
+            return
+        self.sent += 1
+        await self._repo.complete_greeting(entry)
+
+    async def _failed(self, entry: OutboxEntry, error: Exception) -> None:
+        if isinstance(error, TelegramForbiddenError) or (
+            entry.attempts >= self._max_attempts
+        ):
+            self.dropped += 1
+            logger.error(
+                "Dropping greeting in channel %d for user %d after %d attempts: %s",
+                entry.channel_id,
+                entry.user_id,
+                entry.attempts,
+                error,
+            )
+            await self._repo.drop_greeting(entry.id)
+            return
+        delay = min(_BACKOFF_BASE * 2 ** (entry.attempts - 1), _BACKOFF_MAX)
+        self.retried += 1
+        logger.warning(
+            "Greeting in channel %d for user %d failed (attempt %d), retrying in %ds: %s",
+            entry.channel_id,
+            entry.user_id,
+            entry.attempts,
+            delay,
+            error,
+        )
+        await self._repo.retry_greeting(entry.id, time.time() + delay, str(error))
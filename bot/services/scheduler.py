@@ -1,29 +1,101 @@
 from __future__ import annotations
 
+import datetime
 import logging
+import time
+from zoneinfo import ZoneInfo
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
 
 from bot.db.repositories import Repository
-from bot.services.greeting import GreetingService
-from bot.utils.date_helpers import today_in_timezone
+from bot.services.outbox import GreetingOutbox
+from bot.utils.date_helpers import birthdays_on, local_today
 
 logger = logging.getLogger(__name__)
 
+UTC = datetime.timezone.utc
+
+# bot_state key holding the epoch minute of the last processed tick
+WATERMARK_KEY = "scheduler_watermark"
+
+
+def epoch_minute(moment: datetime.datetime) -> int:
+    """Whole minutes since the Unix epoch for an aware datetime."""
+    return int(moment.timestamp()) // 60
+
+
+def next_fire_minute(
+    greeting_time: str, timezone: str, after: datetime.datetime
+) -> int:
+    """Epoch minute of the first ``greeting_time`` in ``timezone`` strictly after ``after``.
+
+    The local time is converted with the UTC offset in effect on that date,
+    so the result follows DST changes.
+    """
+    tz = ZoneInfo(timezone)
+    fire_at = datetime.time(*map(int, greeting_time.split(":")))
+    local_date = after.astimezone(tz).date()
+    for offset in range(3):
+        candidate = datetime.datetime.combine(
+            local_date + datetime.timedelta(days=offset), fire_at, tzinfo=tz
+        )
+        if candidate > after:
+            return epoch_minute(candidate)
+    raise AssertionError("no greeting time within three days")
+
 
 class SchedulerService:
-    def __init__(self, repo: Repository, greeting_service: GreetingService) -> None:
+    """Fires each channel's daily greeting from a single per-minute timer.
+
+    Channels are grouped into buckets keyed by the UTC minute of their next
+    greeting. One APScheduler job wakes at the start of every minute and
+    dispatches only the channels in the buckets that came due, then moves
+    each of them to the bucket of its next greeting. Due greetings are
+    handed to the ``GreetingOutbox``, which does the actual sending.
+
+    The last processed minute is persisted once a tick's greetings are
+    queued; if queuing fails, its channels go back into their buckets and
+    the next tick retries those minutes. On startup, greetings whose time
+    fell between that watermark and now (at most ``catchup_grace`` minutes
+    back) are queued before the timer starts.
+    """
+
+    def __init__(
+        self, repo: Repository, outbox: GreetingOutbox, catchup_grace: int = 360
+    ) -> None:
         self._scheduler = AsyncIOScheduler()
         self._repo = repo
-        self._greeting = greeting_service
+        self._outbox = outbox
+        self._catchup_grace = catchup_grace
+        # channel_id -> (greeting_time, timezone)
+        self._channels: dict[int, tuple[str, str]] = {}
+        # channel_id -> epoch minute of its next greeting
+        self._next_fire: dict[int, int] = {}
+        # epoch minute -> channel ids due in that minute
+        self._buckets: dict[int, set[int]] = {}
+        self._last_tick = epoch_minute(datetime.datetime.now(UTC))
 
     async def start(self) -> None:
         channels = await self._repo.get_all_channels()
         for ch in channels:
-            self._add_channel_job(ch["id"], ch["greeting_time"], ch["timezone"])
+            self._add_channel_job(ch.id, ch.greeting_time, ch.timezone)
+        self._last_tick = epoch_minute(datetime.datetime.now(UTC))
+        await self._catch_up()
+        self._scheduler.add_job(
+            self._tick,
+            CronTrigger(second=0),
+            id="greeting_tick",
+            coalesce=True,
+            max_instances=1,
+            misfire_grace_time=30,
+        )
         self._scheduler.start()
-        logger.info("Scheduler started with %d channel jobs", len(channels))
+        logger.info(
+            "Scheduler started with %d channels in %d minute buckets",
+            len(channels),
+            len(self._buckets),
+        )
 
     def shutdown(self) -> None:
         self._scheduler.shutdown(wait=False)
@@ -38,46 +110,149 @@ class SchedulerService:
         )
 
     def remove_channel_job(self, channel_id: int) -> None:
-        job_id = f"greet_{channel_id}"
-        if self._scheduler.get_job(job_id):
-            self._scheduler.remove_job(job_id)
+        if self._channels.pop(channel_id, None) is not None:
+            self._unschedule(channel_id)
             logger.info("Removed job for channel %d", channel_id)
 
     def _add_channel_job(
         self, channel_id: int, greeting_time: str, timezone: str
     ) -> None:
-        hour, minute = map(int, greeting_time.split(":"))
-        self._scheduler.add_job(
-            self._greet_channel,
-            CronTrigger(hour=hour, minute=minute, timezone=timezone),
-            id=f"greet_{channel_id}",
-            args=[channel_id],
-            replace_existing=True,
-        )
+        self._unschedule(channel_id)
+        self._channels[channel_id] = (greeting_time, timezone)
+        self._schedule_next(channel_id, datetime.datetime.now(UTC))
 
-    async def _greet_channel(self, channel_id: int) -> None:
-        channel = await self._repo.get_channel(channel_id)
-        if not channel:
-            return
-
-        tz = channel["timezone"]
-        day, month = today_in_timezone(tz)
+    def _schedule_next(self, channel_id: int, after: datetime.datetime) -> None:
+        greeting_time, timezone = self._channels[channel_id]
+        minute = next_fire_minute(greeting_time, timezone, after)
+        self._next_fire[channel_id] = minute
+        self._buckets.setdefault(minute, set()).add(channel_id)
 
-        birthdays = await self._repo.get_birthdays_by_date(channel_id, day, month)
+    def _unschedule(self, channel_id: int) -> None:
+        minute = self._next_fire.pop(channel_id, None)
+        if minute is None:
+            return
+        bucket = self._buckets.get(minute)
+        if bucket is not None:
+            bucket.discard(channel_id)
+            if not bucket:
+                del self._buckets[minute]
 
-        for bd in birthdays:
+    async def _tick(self) -> None:
+        now_minute = epoch_minute(datetime.datetime.now(UTC))
+        # channel_id -> the minute it fired in
+        fired: dict[int, int] = {}
+        # Also drain minutes skipped by a late or missed tick
+        for minute in range(self._last_tick + 1, now_minute + 1):
+            bucket = self._buckets.pop(minute, None)
+            if not bucket:
+                continue
+            fired_at = datetime.datetime.fromtimestamp(minute * 60, UTC)
+            for channel_id in bucket:
+                del self._next_fire[channel_id]
+                self._schedule_next(channel_id, fired_at)
+                fired[channel_id] = minute
+        if fired:
             try:
-                await self._greeting.send_greeting(
-                    channel_id,
-                    bd["user_id"],
-                    bd["username"],
-                    bd["first_name"],
-                    bd["birth_day"],
-                    bd["birth_month"],
-                )
+                queued = await self._greet_channels(list(fired))
             except Exception:
+                # Put the channels back so the next tick retries these minutes
                 logger.exception(
-                    "Failed to send greeting in channel %d for user %d",
-                    channel_id,
-                    bd["user_id"],
+                    "Failed to queue greetings for %d channels", len(fired)
+                )
+                for channel_id, minute in fired.items():
+                    if channel_id in self._channels:
+                        self._unschedule(channel_id)
+                        self._next_fire[channel_id] = minute
+                        self._buckets.setdefault(minute, set()).add(channel_id)
+                return
+            logger.info("Queued %d greetings for %d channels", queued, len(fired))
+        self._last_tick = max(self._last_tick, now_minute)
+        await self._save_watermark()
+
+    async def _save_watermark(self) -> None:
+        try:
+            await self._repo.set_state(WATERMARK_KEY, str(self._last_tick))
+        except Exception:
+            logger.exception("Failed to save scheduler watermark")
+
+    async def _catch_up(self) -> None:
+        """Queue greetings whose time passed while the bot was not running.
+
+        Only the distinct (greeting_time, timezone) pairs are walked to find
+        the fire times inside the missed window; birthdays for the matching
+        channels are then fetched with one bulk date query. Greetings that
+        were already sent are skipped by the outbox ledger.
+        """
+        raw = await self._repo.get_state(WATERMARK_KEY)
+        if raw is None:
+            await self._save_watermark()
+            return
+        started = time.perf_counter()
+        since = max(int(raw), self._last_tick - self._catchup_grace)
+        if since >= self._last_tick:
+            return
+
+        by_setting: dict[tuple[str, str], list[int]] = {}
+        for channel_id, setting in self._channels.items():
+            by_setting.setdefault(setting, []).append(channel_id)
+
+        due: list[tuple[int, datetime.date]] = []
+        for (greeting_time, timezone), channel_ids in by_setting.items():
+            tz = ZoneInfo(timezone)
+            after = datetime.datetime.fromtimestamp(since * 60, UTC)
+            while True:
+                minute = next_fire_minute(greeting_time, timezone, after)
+                if minute > self._last_tick:
+                    break
+                after = datetime.datetime.fromtimestamp(minute * 60, UTC)
+                date = after.astimezone(tz).date()
+                due.extend((channel_id, date) for channel_id in channel_ids)
+
+        queued = await self._enqueue_due(due) if due else 0
+        await self._save_watermark()
+        logger.info(
+            "Catch-up for %d missed minutes queued %d greetings "
+            "in %d channel runs (%.3fs)",
+            self._last_tick - since,
+            queued,
+            len(due),
+            time.perf_counter() - started,
+        )
+
+    async def _greet_channels(self, channel_ids: list[int]) -> int:
+        """Queue today's greetings for many channels."""
+        today: dict[str, datetime.date] = {}
+        due: list[tuple[int, datetime.date]] = []
+        for channel_id in channel_ids:
+            settings = self._channels.get(channel_id)
+            if settings is None:
+                continue
+            tz = settings[1]
+            if tz not in today:
+                today[tz] = local_today(tz)
+            due.append((channel_id, today[tz]))
+        return await self._enqueue_due(due)
+
+    async def _enqueue_due(self, due: list[tuple[int, datetime.date]]) -> int:
+        """Queue greetings for (channel_id, local date) pairs using one bulk birthday query."""
+        year = {
+            (channel_id, day, month): date.year
+            for channel_id, date in due
+            for day, month in birthdays_on(date)
+        }
+        by_channel = await self._repo.get_birthdays_by_dates(list(year))
+        return await self._outbox.enqueue(
+            [
+                (
+                    bd.channel_id,
+                    bd.user_id,
+                    year[bd.channel_id, bd.birth_day, bd.birth_month],
+                    bd.username,
+                    bd.first_name,
+                    bd.birth_day,
+                    bd.birth_month,
                 )
+                for birthdays in by_channel.values()
+                for bd in birthdays
+            ]
+        )
@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+import time
+from typing import Any, Awaitable, Callable, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Per-chat buckets are pruned once this many are tracked
+_MAX_IDLE_BUCKETS = 10_000
+
+
+class TokenBucket:
+    """Reservation-style token bucket.
+
+    ``reserve()`` always takes a token and returns how long the caller must
+    wait before using it, so callers are served in reservation order.
+    """
+
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        refill = (now - self.updated) * self.rate
+        self.tokens = min(self.capacity, self.tokens + refill)
+        self.updated = now
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens -= 1
+        return max(0.0, -self.tokens / self.rate)
+
+    def pause(self, seconds: float) -> None:
+        """Push the next free token at least ``seconds`` into the future."""
+        now = time.monotonic()
+        self._refill(now)
+        self.tokens = min(self.tokens, -seconds * self.rate)
+
+    def is_idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity
+
+
+class _Item:
+    __slots__ = ("chat_id", "send", "future", "enqueued_at", "attempts")
+
+    def __init__(
+        self,
+        chat_id: int,
+        send: Callable[[], Awaitable[Any]],
+        future: asyncio.Future[Any],
+    ) -> None:
+        self.chat_id = chat_id
+        self.send = send
+        self.future = future
+        self.enqueued_at = time.monotonic()
+        self.attempts = 0
+
+
+class SendQueue:
+    """Outbound message queue that respects Telegram's rate limits.
+
+    Each send first waits for a slot in its chat's bucket (``chat_rate``
+    messages per second, bursts of ``chat_burst``) and then for a slot in
+    the global bucket (``global_rate`` messages per second). At most
+    ``concurrency`` requests are in flight. ``TelegramRetryAfter`` pauses
+    the chat for the requested time and retries, up to ``max_attempts``.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        chat_rate: float = 20 / 60,
+        chat_burst: float = 3,
+        concurrency: int = 8,
+        max_attempts: int = 5,
+    ) -> None:
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chat_rate = chat_rate
+        self._chat_burst = chat_burst
+        self._chats: dict[int, TokenBucket] = {}
+        self._concurrency = concurrency
+        self._max_attempts = max_attempts
+        self._ready: asyncio.Queue[_Item] = asyncio.Queue()
+        self._workers: list[asyncio.Task] = []
+        self._depth = 0
+        self.sent = 0
+        self.retries = 0
+        self.failed = 0
+        self.total_delay = 0.0
+        self.max_delay = 0.0
+
+    def start(self) -> None:
+        if not self._workers:
+            self._workers = [
+                asyncio.create_task(self._worker()) for _ in range(self._concurrency)
+            ]
+
+    async def stop(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        for task in self._workers:
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+        self._workers = []
+        logger.info("Send queue stopped: %s", self.stats)
+
+    async def send(self, chat_id: int, send: Callable[[], Awaitable[T]]) -> T:
+        """Queue ``send()`` for ``chat_id`` and wait for its result."""
+        future: asyncio.Future[T] = asyncio.get_running_loop().create_future()
+        self._depth += 1
+        self._schedule(_Item(chat_id, send, future))
+        return await future
+
+    @property
+    def depth(self) -> int:
+        """Messages accepted but not yet sent or failed."""
+        return self._depth
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "depth": self._depth,
+            "sent": self.sent,
+            "retries": self.retries,
+            "failed": self.failed,
+            "avg_delay": self.total_delay / self.sent if self.sent else 0.0,
+            "max_delay": self.max_delay,
+        }
+
+    def _schedule(self, item: _Item) -> None:
+        wait = self._chat_bucket(item.chat_id).reserve()
+        if wait > 0:
+            loop = asyncio.get_running_loop()
+            loop.call_later(wait, self._ready.put_nowait, item)
+        else:
+            self._ready.put_nowait(item)
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= _MAX_IDLE_BUCKETS:
+                self._chats = {
+                    cid: b for cid, b in self._chats.items() if not b.is_idle()
+                }
+            bucket = self._chats[chat_id] = TokenBucket(
+                self._chat_rate, self._chat_burst
+            )
+        return bucket
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self._ready.get()
+            if item.future.cancelled():
+                self._depth -= 1
+                continue
+            wait = self._global.reserve()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            await self._deliver(item)
+
+    async def _deliver(self, item: _Item) -> None:
+        item.attempts += 1
+        try:
+            result = await item.send()
+        except TelegramRetryAfter as e:
+            if item.attempts < self._max_attempts:
+                self.retries += 1
+                logger.warning(
+                    "Rate limited in chat %d, retrying in %ds",
+                    item.chat_id,
+                    e.retry_after,
+                )
+                self._chat_bucket(item.chat_id).pause(e.retry_after)
+                self._schedule(item)
+                return
+            self._finish(item, error=e)
+        except Exception as e:
+            self._finish(item, error=e)
+        else:
+            self._finish(item, result=result)
+
+    def _finish(
+        self, item: _Item, result: Any = None, error: BaseException | None = None
+    ) -> None:
+        self._depth -= 1
+        if error is not None:
+            self.failed += 1
+            if not item.future.done():
+                item.future.set_exception(error)
+            return
+        delay = time.monotonic() - item.enqueued_at
+        self.sent += 1
+        self.total_delay += delay
+        self.max_delay = max(self.max_delay, delay)
+        if not item.future.done():
+            item.future.set_result(result)
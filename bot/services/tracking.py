@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+
+from bot.db.repositories import Repository
+
+logger = logging.getLogger(__name__)
+
+
+class UserTracker:
+    """Write-behind buffer for known_users updates.
+
+    Updates are coalesced per (user_id, channel_id) and written in a single
+    batch every ``flush_interval`` seconds, or as soon as ``batch_size``
+    distinct users are pending. Flushes run in the background task, so
+    ``track()`` never waits on the database; a batch that fails to write is
+    merged back into the pending updates and retried on the next flush.
+    Updates that match what is already stored (per the repository's
+    known_users cache) are dropped.
+    """
+
+    def __init__(
+        self, repo: Repository, flush_interval: float, batch_size: int
+    ) -> None:
+        self._repo = repo
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._pending: dict[tuple[int, int], tuple[str | None, str | None]] = {}
+        self._lock = asyncio.Lock()
+        # Set when batch_size users are pending, to flush before the interval
+        self._full = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+        await self.flush()
+
+    async def track(
+        self,
+        user_id: int,
+        channel_id: int,
+        username: str | None,
+        first_name: str | None,
+    ) -> None:
+        key = (user_id, channel_id)
+        if key not in self._pending and self._repo.is_known_user_current(
+            user_id, channel_id, username, first_name
+        ):
+            return
+        self._pending[key] = (username, first_name)
+        if len(self._pending) >= self._batch_size:
+            self._full.set()
+
+    async def flush(self) -> None:
+        async with self._lock:
+            if not self._pending:
+                return
+            batch, self._pending = self._pending, {}
+            rows = [
+                (user_id, channel_id, username, first_name)
+                for (user_id, channel_id), (username, first_name) in batch.items()
+            ]
+            try:
+                await self._repo.upsert_known_users(rows)
+            except Exception:
+                logger.exception("Failed to flush %d tracked users", len(rows))
+                # Keep them for the next flush; updates made since are newer
+                for key, value in batch.items():
+                    self._pending.setdefault(key, value)
+                return
+            logger.debug(
+                "Flushed %d tracked users (cache: %s)",
+                len(rows),
+                self._repo.known_users_cache.stats,
+            )
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._full.wait(), self._flush_interval)
+            self._full.clear()
+            await self.flush()
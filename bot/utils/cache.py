@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Generic, Hashable, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+V = TypeVar("V")
+
+_MISSING = object()
+
+
+class LRUCache(Generic[K, V]):
+    """Bounded mapping that evicts the least recently used entry.
+
+    If ``ttl`` is given, entries older than ``ttl`` seconds are treated as
+    missing. Hits, misses and evictions are counted for sizing the cache.
+    """
+
+    def __init__(self, maxsize: int, ttl: float | None = None) -> None:
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[K, tuple[V, float]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, default: Any = None) -> V | Any:
+        entry = self._data.get(key, _MISSING)
+        if entry is _MISSING:
+            self.misses += 1
+            return default
+        value, stored_at = entry
+        if self._ttl is not None and time.monotonic() - stored_at > self._ttl:
+            del self._data[key]
+            self.misses += 1
+            return default
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        self._data[key] = (value, time.monotonic())
+        self._data.move_to_end(key)
+        while len(self._data) > self._maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def pop(self, key: K) -> None:
+        self._data.pop(key, None)
+
+    def discard_where(self, predicate: Callable[[K], bool]) -> None:
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -1,6 +1,9 @@
+import calendar
 import datetime
 from zoneinfo import ZoneInfo
 
+from bot.db.models import Birthday
+
 MONTH_NAMES = [
     "",
     "January",
@@ -49,6 +52,20 @@ def parse_birthday(text: str) -> tuple[int, int]:
     return day, month
 
 
+def parse_days(text: str) -> int:
+    """Parse a number of days (0-365) for /upcoming.
+
+    Raises ValueError on invalid input.
+    """
+    try:
+        days = int(text.strip())
+    except ValueError:
+        raise ValueError("Days must be a number (e.g. /upcoming 14)")
+    if days < 0 or days > 365:
+        raise ValueError(f"Days must be between 0 and 365, got {days}")
+    return days
+
+
 def month_name(month: int) -> str:
     """Return the English name of the month (1-12)."""
     return MONTH_NAMES[month]
@@ -60,7 +77,7 @@ def format_birthday(day: int, month: int) -> str:
 
 
 def format_birthday_list(
-    birthdays: list[dict], *, show_id: bool = False
+    birthdays: list[Birthday], *, show_id: bool = False
 ) -> list[str]:
     """Format a list of birthday records into display lines.
 
@@ -69,17 +86,87 @@ def format_birthday_list(
     """
     lines: list[str] = []
     for bd in birthdays:
-        name = bd["first_name"] or "Unknown"
-        username_part = f" (@{bd['username']})" if bd["username"] else ""
-        date_str = format_birthday(bd["birth_day"], bd["birth_month"])
+        name = bd.first_name or "Unknown"
+        username_part = f" (@{bd.username})" if bd.username else ""
+        date_str = format_birthday(bd.birth_day, bd.birth_month)
         line = f"  {date_str} — {name}{username_part}"
         if show_id:
-            line += f" [ID: {bd['user_id']}]"
+            line += f" [ID: {bd.user_id}]"
         lines.append(line)
     return lines
 
 
+def format_upcoming_list(entries: list[tuple[Birthday, int]]) -> list[str]:
+    """Format (birthday, days until) pairs as '  15 June — Name (@username), in 3 days'."""
+    lines: list[str] = []
+    for bd, days in entries:
+        when = "today" if days == 0 else "tomorrow" if days == 1 else f"in {days} days"
+        lines.append(format_birthday_list([bd])[0] + f", {when}")
+    return lines
+
+
+def day_of_year(day: int, month: int) -> int:
+    """Day of a leap year (1-366) for a birthday; 29 February is day 60."""
+    return datetime.date(2000, month, day).timetuple().tm_yday
+
+
+def birthdays_on(date: datetime.date) -> list[tuple[int, int]]:
+    """The (day, month) birthdays celebrated on ``date``.
+
+    In non-leap years 28 February also celebrates 29 February birthdays.
+    """
+    dates = [(date.day, date.month)]
+    if (date.month, date.day) == (2, 28) and not calendar.isleap(date.year):
+        dates.append((29, 2))
+    return dates
+
+
+def birthday_in(year: int, day: int, month: int) -> datetime.date:
+    """The date the birthday falls on in ``year``.
+
+    In non-leap years a 29 February birthday falls on 28 February.
+    """
+    try:
+        return datetime.date(year, month, day)
+    except ValueError:
+        return datetime.date(year, 2, 28)
+
+
+def next_birthday(day: int, month: int, today: datetime.date) -> datetime.date:
+    """The next date, today or later, the birthday falls on.
+
+    In non-leap years a 29 February birthday falls on 28 February.
+    """
+    for year in (today.year, today.year + 1):
+        date = birthday_in(year, day, month)
+        if date >= today:
+            return date
+    raise AssertionError("unreachable")
+
+
+def upcoming_window(today: datetime.date, days: int) -> tuple[int, int]:
+    """The ``day_of_year`` range for birthdays in the next ``days`` days.
+
+    Returns (first, last); ``first > last`` means the window wraps past 31
+    December. 29 February (day 60) is included when the window reaches
+    28 February of a non-leap year.
+    """
+    first = day_of_year(today.day, today.month)
+    if days >= 365:
+        return first, first - 1 if first > 1 else 366
+    end = today + datetime.timedelta(days=days)
+    last = day_of_year(end.day, end.month)
+    if (end.month, end.day) == (2, 28) and not calendar.isleap(end.year):
+        last = 60
+    return first, last
+
+
 def today_in_timezone(tz_name: str) -> tuple[int, int]:
     """Return today's (day, month) in the given timezone."""
-    now = datetime.datetime.now(ZoneInfo(tz_name))
-    return now.day, now.month
+    today = local_today(tz_name)
+    return today.day, today.month
+
+
+def local_today(tz_name: str) -> datetime.date:
+    """Return today's date in the given timezone."""
+    return datetime.datetime.now(ZoneInfo(tz_name)).date()
@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import html
+import math
+from pathlib import Path
+from string import Formatter
+
+PLACEHOLDERS = frozenset({"name", "username", "day", "month"})
+
+MEDIA_KINDS = frozenset({"photo", "animation", "sticker"})
+
+# Leaves room for the mentions substituted into a template
+MAX_TEMPLATE_LENGTH = 3000
+
+
+class MediaRef:
+    """A local media file sent along with a greeting."""
+
+    __slots__ = ("kind", "path")
+
+    def __init__(self, kind: str, path: Path) -> None:
+        if kind not in MEDIA_KINDS:
+            raise ValueError(f"Unknown media type {kind!r}")
+        self.kind = kind
+        self.path = path
+
+
+class CompiledTemplate:
+    """A greeting template parsed once into literal text and placeholder slots.
+
+    Literal text is HTML-escaped, since greetings are sent with HTML parse
+    mode; ``source`` keeps the text as written.
+    """
+
+    __slots__ = ("source", "parts", "media")
+
+    def __init__(
+        self,
+        source: str,
+        parts: tuple[tuple[str, str | None], ...],
+        media: MediaRef | None = None,
+    ) -> None:
+        self.source = source
+        self.parts = parts
+        self.media = media
+
+    def render(self, values: dict[str, str]) -> str:
+        return "".join(
+            literal + values[field] if field else literal
+            for literal, field in self.parts
+        )
+
+
+def compile_template(text: str, media: MediaRef | None = None) -> CompiledTemplate:
+    """Parse and validate a greeting template.
+
+    Only the ``{name}``, ``{username}``, ``{day}`` and ``{month}``
+    placeholders are allowed, without format specs or conversions, and at
+    least one of ``{name}``/``{username}`` must be present. The template is
+    plain text: ``<``, ``>`` and ``&`` are sent as written.
+
+    Raises ValueError with a user-facing message on invalid input.
+    """
+    text = text.strip()
+    if not text:
+        raise ValueError("The template is empty")
+    if len(text) > MAX_TEMPLATE_LENGTH:
+        raise ValueError(
+            f"The template is too long ({len(text)} characters, "
+            f"max {MAX_TEMPLATE_LENGTH})"
+        )
+
+    try:
+        parsed = list(Formatter().parse(text))
+    except ValueError:
+        raise ValueError(
+            "Unbalanced braces; write {{ and }} for literal braces"
+        )
+
+    parts: list[tuple[str, str | None]] = []
+    for literal, field, spec, conversion in parsed:
+        if field is not None and field not in PLACEHOLDERS:
+            raise ValueError(
+                f"Unknown placeholder {{{field}}}; use {{name}}, {{username}}, "
+                "{day} or {month}"
+            )
+        if spec or conversion:
+            raise ValueError(f"Placeholder {{{field}}} cannot have a format")
+        parts.append((html.escape(literal, quote=False), field))
+
+    if not any(field in ("name", "username") for _, field in parts):
+        raise ValueError("The template must mention {name} or {username}")
+    return CompiledTemplate(text, tuple(parts), media)
+
+
+def rotation_index(seed: int, cursor: int, size: int) -> int:
+    """Position ``cursor`` of the ``seed``-th shuffled order of ``size`` items.
+
+    The order is the affine permutation ``i -> (a * i + b) mod size`` with
+    ``a`` coprime to ``size``, so cursors 0..size-1 visit every item exactly
+    once and each lookup is O(1).
+    """
+    if size <= 1:
+        return 0
+    b = seed % size
+    a = (seed // size) % size or 1
+    while math.gcd(a, size) != 1:
+        a = a % (size - 1) + 1
+    return (a * cursor + b) % size
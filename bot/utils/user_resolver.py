@@ -43,10 +43,10 @@ async def resolve_user(
         if not known:
             return None
         return ResolvedUser(
-            user_id=known["user_id"],
-            first_name=known["first_name"],
-            username=known["username"],
-            display=f"@{username} (ID: {known['user_id']})",
+            user_id=known.user_id,
+            first_name=known.first_name,
+            username=known.username,
+            display=f"@{username} (ID: {known.user_id})",
         )
 
     if text.isdigit():
@@ -54,8 +54,8 @@ async def resolve_user(
         known = await repo.find_user_by_id(channel_id, uid)
         return ResolvedUser(
             user_id=uid,
-            first_name=known["first_name"] if known else None,
-            username=known["username"] if known else None,
+            first_name=known.first_name if known else None,
+            username=known.username if known else None,
         )
 
     return None
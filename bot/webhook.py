@@ -0,0 +1,140 @@
+from __future__ import annotations
+
+import asyncio
+import hmac
+import logging
+import signal
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Receives updates from Telegram on an embedded aiohttp server.
+
+    Requests without the secret token are rejected with 401. Each update
+    is acknowledged as soon as it is parsed and handled in a background
+    task; at most ``concurrency`` updates are handled at once, after which
+    requests wait for a free slot, so Telegram holds back further updates
+    instead of the bot queuing them without bound. ``stop()`` stops
+    accepting requests and waits for updates already accepted.
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        secret_token: str,
+        path: str = "/webhook",
+        concurrency: int = 40,
+    ) -> None:
+        if concurrency < 1:
+            raise ValueError(f"concurrency must be at least 1, got {concurrency}")
+        self._dp = dp
+        self._bot = bot
+        self._secret = secret_token.encode()
+        self._path = path
+        self._concurrency = concurrency
+        self._slots = asyncio.Semaphore(concurrency)
+        self._tasks: set[asyncio.Task] = set()
+        self._runner: web.AppRunner | None = None
+        self.received = 0
+        self.rejected = 0
+        self.failed = 0
+
+    @property
+    def stats(self) -> dict[str, Any]:
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "in_flight": len(self._tasks),
+        }
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post(self._path, self._handle)
+        return app
+
+    async def start(self, host: str, port: int) -> int:
+        """Start listening and return the bound port (useful with port 0)."""
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        return self._runner.addresses[0][1]
+
+    async def stop(self) -> None:
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+        if self._tasks:
+            logger.info("Waiting for %d updates in progress...", len(self._tasks))
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def run(self, host: str, port: int, url: str) -> None:
+        """Serve until SIGINT/SIGTERM, running the dispatcher's startup and
+        shutdown hooks around it like ``start_polling`` does."""
+        stopping = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stopping.set)
+
+        workflow_data = {
+            "dispatcher": self._dp,
+            "bots": [self._bot],
+            **self._dp.workflow_data,
+            "bot": self._bot,
+        }
+        await self._dp.emit_startup(**workflow_data)
+        try:
+            await self.start(host, port)
+            await self._bot.set_webhook(
+                url,
+                secret_token=self._secret.decode(),
+                max_connections=min(self._concurrency, 100),
+                allowed_updates=self._dp.resolve_used_update_types(),
+            )
+            logger.info("Webhook server listening on %s:%d for %s", host, port, url)
+            await stopping.wait()
+        finally:
+            for sig in (signal.SIGINT, signal.SIGTERM):
+                loop.remove_signal_handler(sig)
+            logger.info("Stopping webhook server...")
+            await self.stop()
+            logger.info("Webhook stats: %s", self.stats)
+            await self._dp.emit_shutdown(**workflow_data)
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        token = request.headers.get(SECRET_HEADER, "").encode()
+        if not hmac.compare_digest(token, self._secret):
+            self.rejected += 1
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(
+                await request.json(), context={"bot": self._bot}
+            )
+        except ValueError:
+            self.rejected += 1
+            return web.Response(status=400)
+
+        await self._slots.acquire()
+        self.received += 1
+        task = asyncio.create_task(self._process(update))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return web.Response()
+
+    async def _process(self, update: Update) -> None:
+        try:
+            await self._dp.feed_update(self._bot, update)
+        except Exception:
+            self.failed += 1
+            logger.exception("Failed to handle update %d", update.update_id)
+        finally:
+            self._slots.release()